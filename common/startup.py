@@ -0,0 +1,69 @@
+"""Startup timeline and background model loading.
+
+The Flask app binds its port straight away and answers /health, while the
+heavy imports and model loads run in a background thread; /ready turns
+200 once they are done. Every phase is recorded as seconds since the
+process started, so cold-start regressions show up in the report.
+"""
+
+import os
+import threading
+import time
+import traceback
+
+
+def _process_start():
+    """time.time() at which this process started, if it can be found."""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).create_time()
+    except ImportError:
+        return None
+
+
+class Startup:
+    def __init__(self, name):
+        self.name = name
+        self.started = _process_start() or time.time()
+        self.timeline = {} # phase -> seconds since process start
+        self.error = None
+        self._done = threading.Event()
+
+    def mark(self, phase):
+        self.timeline[phase] = round(time.time() - self.started, 3)
+
+    def load_in_background(self, loader):
+        """Run loader() in a daemon thread; the service is ready when it returns."""
+        def run():
+            try:
+                loader()
+                self.mark("ready")
+            except Exception:
+                self.error = traceback.format_exc()
+                print(f"[{self.name}] startup failed:\n{self.error}")
+            finally:
+                self._done.set()
+                self.print_report()
+
+        threading.Thread(target=run, name=f"{self.name}-startup", daemon=True).start()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    def wait_ready(self, timeout=None):
+        self._done.wait(timeout)
+        return self.ready
+
+    def report(self):
+        return {
+            "ready": self.ready,
+            "loading": not self._done.is_set(),
+            "error": self.error,
+            "timeline": dict(self.timeline),
+        }
+
+    def print_report(self):
+        print(f"[{self.name}] startup timeline:")
+        for phase, seconds in self.timeline.items():
+            print(f"  {seconds:8.3f}s  {phase}")
@@ -36,7 +36,12 @@ export default function App() {
     if (data.lyrics_text) {
       setLyricsText(data.lyrics_text);
     }
-    setAudioUrl(`${PROXY_SERVER_URL}/stream_audio?song_id=${data.song_id}&type=instrumental`);
+    // Songs handed over while still separating play from the live HLS
+    // playlist, which keeps growing until the instrumental is complete
+    const live = data.status !== 'done' && data.live_playlist;
+    setAudioUrl(live
+      ? `${PROXY_SERVER_URL}${data.live_playlist}`
+      : `${PROXY_SERVER_URL}/stream_audio?song_id=${data.song_id}&type=instrumental`);
     setFile(null); // Clear raw file, we will use the processed audioUrl!
     setAppState('karaoke');
   };
@@ -135,6 +140,7 @@ export default function App() {
           songTitle={songTitle}
           artist={artist}
           onComplete={finishProcessing}
+          onLiveReady={finishProcessing}
           onError={handleProcessingError}
         />
       )}
@@ -193,6 +193,14 @@ export const KaraokeScreen = ({
         }
     };
 
+    const handleDurationChange = () => {
+        // A live playlist grows until separation finishes
+        const audio = audioRef.current as any;
+        if (audio && Number.isFinite(audio.duration)) {
+            setDuration(audio.duration);
+        }
+    };
+
     const handleSeek = (e: React.ChangeEvent<HTMLInputElement>) => {
         const time = parseFloat(e.target.value);
         if (audioRef.current) {
@@ -214,6 +222,7 @@ export const KaraokeScreen = ({
                 ref={audioRef}
                 onTimeUpdate={handleTimeUpdate}
                 onLoadedMetadata={handleLoadedMetadata}
+                onDurationChange={handleDurationChange}
                 onEnded={() => setIsPlaying(false)}
             />
 
@@ -2,18 +2,26 @@ import { Disc } from "lucide-react";
 import { useEffect, useState, useRef } from "react";
 import '../karaoke.css';
 
+// The progressive instrumental is an HLS playlist; only use it where the
+// browser plays HLS natively, otherwise wait for the finished stem.
+const canPlayHls = () => document.createElement('audio').canPlayType('application/vnd.apple.mpegurl') !== '';
+
 export const ProcessingScreen = ({
     file,
     songTitle,
     artist,
     onComplete,
-    onError
+    onError,
+    onLiveReady
 }: {
     file: File;
     songTitle: string;
     artist: string;
     onComplete: (data: any) => void;
     onError: (err: string) => void;
+    // Called instead of onComplete when playback can start from the live
+    // playlist while separation is still running
+    onLiveReady?: (data: any) => void;
 }) => {
     const [statusText, setStatusText] = useState("Uploading...");
     const hasStarted = useRef(false);
@@ -21,6 +29,8 @@ export const ProcessingScreen = ({
     useEffect(() => {
         let isCancelled = false;
         let pollInterval: any = null;
+        let liveInterval: any = null;
+        let eventSource: EventSource | null = null;
 
         if (hasStarted.current) return;
         hasStarted.current = true;
@@ -57,29 +67,98 @@ export const ProcessingScreen = ({
                 if (isCancelled) return;
                 const songId = data.song_id;
 
-                pollInterval = setInterval(() => {
-                    fetch(`http://localhost:5001/get_song_data?song_id=${songId}`)
-                        .then(res => res.json())
-                        .then(songData => {
-                            if (isCancelled) return;
+                const handleStatus = (status: string) => {
+                    if (status === 'converting') {
+                        setStatusText("Converting Audio...");
+                    } else if (status === 'separating') {
+                        setStatusText("Separating Vocals...");
+                    } else if (status === 'transcribing') {
+                        setStatusText("Transcribing Lyrics...");
+                    }
+                };
 
-                            if (songData.status === 'done') {
-                                clearInterval(pollInterval);
-                                onComplete(songData);
-                            } else if (songData.status === 'separating') {
-                                setStatusText("Separating Vocals...");
-                            } else if (songData.status === 'transcribing') {
-                                setStatusText("Transcribing Lyrics...");
-                            } else if (songData.status.startsWith('error')) {
+                const fetchSongData = () => fetch(`http://localhost:5001/get_song_data?song_id=${songId}`)
+                    .then(res => res.json());
+
+                // The status doesn't change when the first HLS segment is out,
+                // so check for the playlist while the song is being processed.
+                // Lyrics are needed too; with the default pipeline they're
+                // transcribed alongside separation.
+                const stopWatchingLive = () => {
+                    if (liveInterval) clearInterval(liveInterval);
+                    liveInterval = null;
+                };
+                if (onLiveReady && canPlayHls()) {
+                    liveInterval = setInterval(() => {
+                        fetchSongData()
+                            .then(songData => {
+                                if (isCancelled || !liveInterval) return;
+                                if (songData.status === 'done' || songData.status.startsWith('error')) {
+                                    stopWatchingLive();
+                                } else if (songData.live_playlist && songData.lyrics_json) {
+                                    stopWatchingLive();
+                                    eventSource?.close();
+                                    if (pollInterval) clearInterval(pollInterval);
+                                    onLiveReady(songData);
+                                }
+                            })
+                            .catch(() => { }); // the status stream or polling reports real failures
+                    }, 2000);
+                }
+
+                // Fallback for when the event stream can't be used: poll the full song row
+                const startPolling = () => {
+                    pollInterval = setInterval(() => {
+                        fetchSongData()
+                            .then(songData => {
+                                if (isCancelled) return;
+
+                                if (songData.status === 'done') {
+                                    clearInterval(pollInterval);
+                                    stopWatchingLive();
+                                    onComplete(songData);
+                                } else if (songData.status.startsWith('error')) {
+                                    clearInterval(pollInterval);
+                                    stopWatchingLive();
+                                    onError(`Backend failed: ${songData.status}`);
+                                } else {
+                                    handleStatus(songData.status);
+                                }
+                            })
+                            .catch(err => {
                                 clearInterval(pollInterval);
-                                onError(`Backend failed: ${songData.status}`);
-                            }
-                        })
-                        .catch(err => {
-                            clearInterval(pollInterval);
-                            onError("Polling error: " + err.message);
-                        });
-                }, 3000);
+                                onError("Polling error: " + err.message);
+                            });
+                    }, 3000);
+                };
+
+                // Status changes are pushed by the proxy; the full song data
+                // (with lyrics) is only fetched once it is done.
+                eventSource = new EventSource(`http://localhost:5001/events?song_id=${songId}`);
+                eventSource.onmessage = (event) => {
+                    if (isCancelled) return;
+                    const update = JSON.parse(event.data);
+
+                    if (update.status === 'done') {
+                        eventSource?.close();
+                        stopWatchingLive();
+                        fetchSongData()
+                            .then(songData => {
+                                if (!isCancelled) onComplete(songData);
+                            })
+                            .catch(err => onError("Fetch error: " + err.message));
+                    } else if (update.status.startsWith('error')) {
+                        eventSource?.close();
+                        stopWatchingLive();
+                        onError(`Backend failed: ${update.status}`);
+                    } else {
+                        handleStatus(update.status);
+                    }
+                };
+                eventSource.onerror = () => {
+                    eventSource?.close();
+                    if (!isCancelled) startPolling();
+                };
             })
             .catch(err => {
                 if (!isCancelled) {
@@ -90,8 +169,10 @@ export const ProcessingScreen = ({
         return () => {
             isCancelled = true;
             if (pollInterval) clearInterval(pollInterval);
+            if (liveInterval) clearInterval(liveInterval);
+            if (eventSource) eventSource.close();
         };
-    }, [file, songTitle, artist, onComplete, onError]);
+    }, [file, songTitle, artist, onComplete, onError, onLiveReady]);
 
     return (
         <div className="relative z-10 flex flex-col items-center justify-center min-h-screen text-white">
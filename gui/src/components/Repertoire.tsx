@@ -15,28 +15,41 @@ interface RepertoireProps {
 }
 
 const CURRENT_USER_ID = 1; // Hardcoded for now until Auth is implemented
+const PAGE_SIZE = 50;
 
 export default function Repertoire({ onBack, onPlaySong }: RepertoireProps) {
     const [songs, setSongs] = useState<Song[]>([]);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [searchQuery, setSearchQuery] = useState('');
     const [mySongsOnly, setMySongsOnly] = useState(false);
     const [error, setError] = useState<string | null>(null);
 
     useEffect(() => {
         fetchSongs();
-    }, []);
+    }, [mySongsOnly]);
+
+    // One page of the listing; the X-Next-Cursor header points at the next one
+    const fetchPage = async (cursor: string | null) => {
+        const params = new URLSearchParams({ sort: 'title', limit: String(PAGE_SIZE) });
+        if (cursor) params.set('cursor', cursor);
+        if (mySongsOnly) params.set('owner_id', String(CURRENT_USER_ID));
+        const response = await fetch(`http://localhost:5001/list_available_songs?${params}`);
+        if (!response.ok) {
+            throw new Error(`Error fetching songs: ${response.statusText}`);
+        }
+        const data = await response.json();
+        return { page: (data || []) as Song[], cursor: response.headers.get('X-Next-Cursor') };
+    };
 
     const fetchSongs = async () => {
         try {
             setLoading(true);
             setError(null);
-            const response = await fetch('http://localhost:5001/list_available_songs');
-            if (!response.ok) {
-                throw new Error(`Error fetching songs: ${response.statusText}`);
-            }
-            const data = await response.json();
-            setSongs(data || []);
+            const { page, cursor } = await fetchPage(null);
+            setSongs(page);
+            setNextCursor(cursor);
         } catch (err: any) {
             setError(err.message || 'Failed to fetch repertoire');
         } finally {
@@ -44,16 +57,36 @@ export default function Repertoire({ onBack, onPlaySong }: RepertoireProps) {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor || loadingMore) return;
+        try {
+            setLoadingMore(true);
+            const { page, cursor } = await fetchPage(nextCursor);
+            setSongs((loaded) => [...loaded, ...page]);
+            setNextCursor(cursor);
+        } catch (err: any) {
+            setError(err.message || 'Failed to fetch repertoire');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    // Load the next page when the list is scrolled close to its end
+    const handleScroll = (e: React.UIEvent<HTMLDivElement>) => {
+        const el = e.currentTarget;
+        if (el.scrollHeight - el.scrollTop - el.clientHeight < 200) {
+            loadMore();
+        }
+    };
+
     const filteredSongs = songs.filter((song) => {
         // Search filter
         const matchesSearch =
             song.song_title?.toLowerCase().includes(searchQuery.toLowerCase()) ||
             song.original_artist?.toLowerCase().includes(searchQuery.toLowerCase());
 
-        // Owner filter
-        const matchesOwner = mySongsOnly ? song.owner_id === CURRENT_USER_ID : true;
-
-        return matchesSearch && matchesOwner;
+        // The owner filter is applied by the server (owner_id)
+        return matchesSearch;
     });
 
     return (
@@ -114,7 +147,7 @@ export default function Repertoire({ onBack, onPlaySong }: RepertoireProps) {
                 </div>
 
                 {/* Table Area */}
-                <div className="flex-1 overflow-auto p-0">
+                <div className="flex-1 overflow-auto p-0" onScroll={handleScroll}>
                     {loading ? (
                         <div className="flex flex-col items-center justify-center h-full p-12 text-gray-400">
                             <Loader2 className="w-8 h-8 animate-spin mb-4 text-indigo-500" />
@@ -174,6 +207,18 @@ export default function Repertoire({ onBack, onPlaySong }: RepertoireProps) {
                             </tbody>
                         </table>
                     )}
+                    {!loading && !error && nextCursor && (
+                        <div className="flex justify-center p-4">
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="inline-flex items-center gap-2 px-4 py-2 rounded-lg bg-white/10 hover:bg-white/20 text-sm text-gray-200 transition-colors disabled:opacity-50"
+                            >
+                                {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+                                Load more
+                            </button>
+                        </div>
+                    )}
                 </div>
             </div>
         </div>
@@ -2,11 +2,23 @@ import sys
 import os
 import traceback
 from pathlib import Path
+# startup.py is shared by the services and lives in the repo's common/ directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from startup import Startup
+
+startup = Startup("separation")
+
 from flask import Flask, request, jsonify
-from separation import AudioSeparation
+from separation import AudioSeparation, ProgressiveUnsupported
+from scratch import SHARED_OUTPUTS_ROOT, SCRATCH_DIRNAME, cleanup_orphaned_scratch
+
+startup.mark("imports")
 
 app = Flask(__name__)
 
+# How long /separate waits for the model to finish loading before giving up
+READY_TIMEOUT = int(os.environ.get("SEPARATION_READY_TIMEOUT", 600))
+
 # Add local FFMPEG bin to PATH
 ffmpeg_bin = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "libs", "ffmpeg_bin")
 if os.path.exists(ffmpeg_bin):
@@ -25,19 +37,32 @@ if sys.stdout:
 # Global handler instance
 separator = None
 
-def get_separator():
+def load_separator():
+    """Start the workers and wait for them to load htdemucs; runs in the background at startup."""
     global separator
-    if separator is None:
-        try:
-            print("Initializing HDEMUCS Separation Model...")
-            separator = AudioSeparation()
-            print("Service initialized successfully.")
-        except Exception as e:
-            print(f"Exception during initialization: {e}")
-            traceback.print_exc()
-            separator = None
+    print("Initializing HDEMUCS Separation Model...")
+    sep = AudioSeparation()
+    startup.mark("separator_initialized")
+    sep.warm_up()
+    startup.mark("workers_warm")
+    separator = sep
+    print("Service initialized successfully.")
+
+def get_separator():
+    if not startup.wait_ready(READY_TIMEOUT):
+        return None
     return separator
 
+@app.route('/health')
+def health():
+    """Liveness: the process is up and serving, whether or not the model is loaded."""
+    return jsonify({'status': 'ok', **startup.report()}), 200
+
+@app.route('/ready')
+def ready():
+    report = startup.report()
+    return jsonify(report), 200 if report['ready'] else 503
+
 @app.route('/separate', methods=['POST'])
 def separate_audio_endpoint():
     data = request.get_json()
@@ -56,32 +81,30 @@ def separate_audio_endpoint():
 
     sep = get_separator()
     if not sep:
-        return jsonify({'error': 'Separation model not initialized'}), 500
+        return jsonify({'error': 'Separation model not initialized', **startup.report()}), 503
 
     print(f"Processing: {input_path}")
-    results = {}
 
     try:
-        # Pass the output_dir directly.
-        sep.separate(str(input_path), str(output_dir))
-        
-        # AudioSeparation saves directly to the passed output_dir now.
-        vocals_dst = output_dir / "vocals.wav"
-        inst_dst = output_dir / "instrumental.wav"
-            
-        results['vocal_file'] = str(vocals_dst) if vocals_dst.exists() else None
-        results['accompaniment_file'] = str(inst_dst) if inst_dst.exists() else None
-        
+        # Separation runs in a private scratch directory and the finished
+        # stems are renamed into output_dir, so concurrent requests are safe.
+        results = sep.separate(str(input_path), str(output_dir), progressive=bool(data.get('progressive')))
         return jsonify(results), 200
 
+    except ProgressiveUnsupported as e:
+        # Nothing was separated; the caller can ask again without progressive
+        return jsonify({'error': str(e), 'code': 'progressive_unsupported'}), 422
     except Exception as e:
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
 def main():
-    # Pre-initialize handler if possible
-    get_separator()
+    # Scratch left by a previous run that crashed mid-job
+    cleanup_orphaned_scratch(os.path.join(SHARED_OUTPUTS_ROOT, SCRATCH_DIRNAME))
+    # Load the model while Flask is already answering /health
+    startup.load_in_background(load_separator)
+    startup.mark("serving")
     app.run(debug=False, port=5002, use_reloader=False)
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+"""Progressive HLS output of a stem while it is still being separated.
+
+Audio is appended in time order and piped into one long-lived ffmpeg running
+the hls muxer, which cuts it into AAC MPEG-TS segments of about
+`segment_seconds` and keeps an EVENT playlist up to date, so a player can
+start on the first segments while later ones are still being computed.
+Because it is a single encoder the segments join without the priming gap a
+fresh AAC encoder would add at every boundary. With hls_flags temp_file,
+segments and the playlist are written under a temporary name and renamed,
+so readers never see a half-written file; #EXT-X-ENDLIST is added when the
+input is closed.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+PLAYLIST_NAME = "instrumental.m3u8"
+SEGMENT_PATTERN = "seg_%05d.ts"
+
+
+class HlsError(Exception):
+    """ffmpeg could not be started or failed while writing the stream."""
+
+
+class HlsWriter:
+    def __init__(self, directory, segment_seconds=6.0, bitrate="192k"):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.bitrate = bitrate
+        self.sample_rate = None
+        self.channels = None
+        self._process = None
+        self._stderr = None
+        # Start from a clean slate if a previous attempt left segments behind
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+    @property
+    def playlist_path(self):
+        return os.path.join(self.directory, PLAYLIST_NAME)
+
+    def _start(self, sample_rate, channels):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+            "-c:a", "aac", "-b:a", self.bitrate,
+            "-f", "hls",
+            "-hls_time", f"{self.segment_seconds:g}",
+            "-hls_playlist_type", "event",
+            "-hls_flags", "temp_file",
+            "-hls_segment_filename", os.path.join(self.directory, SEGMENT_PATTERN),
+            self.playlist_path,
+        ]
+        # A file rather than a pipe, so a chatty ffmpeg can never block on it
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+        except OSError as e:
+            raise HlsError(f"Could not start ffmpeg: {e}")
+
+    def write(self, audio, sample_rate):
+        """Append (channels, samples) float audio."""
+        audio = np.asarray(audio, dtype=np.float32)
+        if self._process is None:
+            self._start(sample_rate, audio.shape[0])
+        elif (sample_rate, audio.shape[0]) != (self.sample_rate, self.channels):
+            raise HlsError("Sample rate or channel count changed mid-stream")
+        pcm = np.clip(audio, -1.0, 1.0).T.astype("<f4").tobytes() # interleaved
+        try:
+            self._process.stdin.write(pcm)
+        except OSError:
+            # ffmpeg exited; _wait() raises with its error output
+            self._wait()
+            raise HlsError("ffmpeg exited before the end of the stream")
+
+    def close(self):
+        """Finish the stream: flush the last segment and end the playlist."""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._wait()
+
+    def abort(self):
+        """Stop ffmpeg and remove the partial stream, so players don't wait on a playlist that never ends."""
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._stderr.close()
+            self._process = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _wait(self):
+        returncode = self._process.wait()
+        self._stderr.seek(0)
+        message = self._stderr.read().decode("utf-8", errors="replace").strip()
+        self._stderr.close()
+        self._process = None
+        if returncode != 0:
+            raise HlsError(f"ffmpeg exited with {returncode}: {message[-2000:]}")
+        if message:
+            print(f"ffmpeg (HLS): {message}")
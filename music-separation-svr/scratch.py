@@ -0,0 +1,97 @@
+"""Per-job scratch directories for separation.
+
+Every job works in its own directory next to its destination, i.e. on the
+same filesystem, so concurrent jobs never see each other's files and the
+finished stems are moved into place with an atomic rename instead of a copy.
+Directory names carry the owning PID so leftovers from a crashed server can
+be told apart from jobs that are still running.
+"""
+
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+SCRATCH_DIRNAME = ".scratch"
+# Where the proxy puts song outputs; scratch for those jobs lives under it
+SHARED_OUTPUTS_ROOT = os.environ.get(
+    "SHARED_OUTPUTS_ROOT",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared_data", "outputs"),
+)
+# Anything this old is abandoned, whatever its PID says
+MAX_SCRATCH_AGE = 24 * 3600
+
+
+def scratch_root_for(output_dir):
+    return os.path.join(os.path.dirname(os.path.abspath(output_dir)), SCRATCH_DIRNAME)
+
+
+@contextmanager
+def job_scratch(output_dir):
+    """Yield a fresh scratch directory for one job and always remove it afterwards."""
+    root = scratch_root_for(output_dir)
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"{os.getpid()}-{uuid.uuid4().hex}")
+    os.makedirs(path)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def publish(scratch_dir, output_dir, names):
+    """Atomically move finished files from scratch into output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    published = {}
+    for name in names:
+        src = os.path.join(scratch_dir, name)
+        if not os.path.exists(src):
+            raise RuntimeError(f"Separation did not produce {name}")
+        dst = os.path.join(output_dir, name)
+        os.replace(src, dst)
+        published[name] = dst
+    return published
+
+
+def _pid_alive(pid):
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows; assume it's alive
+        # and let MAX_SCRATCH_AGE take care of it.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def cleanup_orphaned_scratch(root):
+    """Remove scratch directories left behind by dead or long-gone processes."""
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    now = time.time()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not os.path.isdir(path):
+            continue
+        pid_str = name.split("-", 1)[0]
+        orphaned = not pid_str.isdigit() or not _pid_alive(int(pid_str))
+        try:
+            too_old = now - os.path.getmtime(path) > MAX_SCRATCH_AGE
+        except OSError:
+            continue
+        if orphaned or too_old:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        print(f"Removed {removed} orphaned scratch director{'y' if removed == 1 else 'ies'} from {root}")
+    return removed
@@ -1,14 +1,24 @@
 """Credit: https://pytorch.org/audio/stable/tutorials/hybrid_demucs_tutorial.html"""
 
-import torch
-import torchaudio
-from torchaudio.transforms import Fade, Resample
+# torch/torchaudio are only imported where they're used, so importing this
+# module (and starting the Flask app) stays fast.
 import sys
 import subprocess
-import shutil
 import os
-import torch
 import argparse
+import time
+from separation_pool import WarmSeparationPool
+from scratch import job_scratch, publish
+from hls import HlsError, HlsWriter
+
+# Stems are stored losslessly; FLAC is about half the size of WAV. The proxy
+# makes smaller lossy copies for streaming on demand.
+STEM_FORMAT = os.environ.get("STEM_FORMAT", "flac")
+if STEM_FORMAT not in ("flac", "wav"):
+    raise ValueError(f"STEM_FORMAT must be 'flac' or 'wav', not {STEM_FORMAT!r}")
+VOCALS_FILE = f"vocals.{STEM_FORMAT}"
+INSTRUMENTAL_FILE = f"instrumental.{STEM_FORMAT}"
+STEM_FILES = (VOCALS_FILE, INSTRUMENTAL_FILE)
 
 # Add local FFMPEG bin to PATH
 ffmpeg_bin = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "libs", "ffmpeg_bin")
@@ -20,20 +30,123 @@ if os.path.exists(ffmpeg_bin):
         except Exception:
             pass
 
+class ProgressiveUnsupported(Exception):
+    """Progressive output was requested from a backend that can't produce it."""
+
+def default_device():
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
 class AudioSeparation:
-    def __init__(self, device=None):
-        self.device = device if device else ("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"Demucs Separation Backend Initialized. Target Device: {self.device}")
+    def __init__(self, device=None, backend=None):
+        self.device = device or os.environ.get("SEPARATION_DEVICE") or default_device()
+        # "pool": warm worker processes that keep htdemucs loaded (default)
+        # "segmented": split each song into overlapping segments separated in
+        #              parallel across the warm workers, then stitched back
+        # "cli": one `python -m demucs.separate` subprocess per song
+        self.backend = backend or os.environ.get("SEPARATION_BACKEND", "pool")
+        self.pool = None
+        self.segmented = None
+        if self.backend in ("pool", "segmented"):
+            cpus = os.cpu_count() or 1
+            default_size = max(1, cpus // 4) if self.backend == "segmented" else 1
+            size = int(os.environ.get("SEPARATION_POOL_SIZE", default_size))
+            self.pool = WarmSeparationPool(
+                size=size,
+                device=self.device,
+                # Songs per worker before it is recycled
+                max_jobs=int(os.environ.get("SEPARATION_WORKER_MAX_JOBS", 20)),
+                max_rss_mb=int(os.environ.get("SEPARATION_WORKER_MAX_RSS_MB", 0)),
+                job_timeout=int(os.environ.get("SEPARATION_JOB_TIMEOUT", 1800)),
+                threads_per_worker=max(1, cpus // size) if self.device == "cpu" else None,
+            )
+        if self.pool:
+            # The pool backend also uses the segmented engine, on the same
+            # workers, for songs that ask for progressive output
+            from segmented_separation import SegmentedSeparator
+            self.segmented = SegmentedSeparator(
+                self.pool,
+                segment_seconds=float(os.environ.get("SEPARATION_SEGMENT_SECONDS", 30)),
+                overlap_seconds=float(os.environ.get("SEPARATION_OVERLAP_SECONDS", 1)),
+            )
+        print(f"Demucs Separation Backend Initialized. Target Device: {self.device}, backend: {self.backend}")
+
+    @property
+    def supports_progressive(self):
+        return self.segmented is not None
+
+    def warm_up(self):
+        """Block until every worker has the model loaded (no-op for the CLI backend)."""
+        if self.pool:
+            self.pool.warm_up()
+
+    def separate(self, audio_path, output_dir_name, progressive=False):
+        """Separate into vocals and instrumental stems (STEM_FORMAT) in output_dir_name.
+
+        With progressive=True the instrumental is also streamed out as HLS
+        segments under output_dir_name/hls while the rest of the song is
+        still being separated. That needs the segmented engine, so the pool
+        backend switches to it for the song; the CLI backend raises
+        ProgressiveUnsupported.
+        """
+        if progressive and not self.supports_progressive:
+            raise ProgressiveUnsupported(f"Progressive output is not supported by the {self.backend} backend")
+        # Each job gets its own scratch directory beside the destination, so
+        # concurrent jobs can't clobber or delete each other's files, and the
+        # finished stems land in output_dir_name with an atomic rename.
+        with job_scratch(output_dir_name) as scratch_dir:
+            if self.segmented and (progressive or self.backend == "segmented"):
+                print(f"Starting segment-parallel Demucs separation on {audio_path} ({self.pool.size} workers)...")
+                hls = None
+                if progressive:
+                    hls = HlsWriter(
+                        os.path.join(output_dir_name, "hls"),
+                        segment_seconds=float(os.environ.get("HLS_SEGMENT_SECONDS", 6)),
+                    )
+
+                def on_instrumental(audio, sample_rate):
+                    # Streaming is a bonus: if it fails, drop it and keep separating
+                    nonlocal hls
+                    if hls:
+                        try:
+                            hls.write(audio, sample_rate)
+                        except HlsError as e:
+                            print(f"Progressive HLS output failed, continuing without it: {e}")
+                            hls.abort()
+                            hls = None
 
-    def separate(self, audio_path, output_dir_name):
+                try:
+                    self.segmented.separate(
+                        audio_path, scratch_dir, on_instrumental=on_instrumental if hls else None, stem_format=STEM_FORMAT
+                    )
+                except Exception:
+                    if hls:
+                        hls.abort()
+                    raise
+                if hls:
+                    try:
+                        hls.close()
+                    except HlsError as e:
+                        print(f"Progressive HLS output failed, continuing without it: {e}")
+                        hls.abort()
+            elif self.pool:
+                print(f"Starting Demucs separation on {audio_path} in a warm worker...")
+                self.pool.separate(audio_path, scratch_dir, stem_format=STEM_FORMAT)
+            else:
+                self._separate_cli(audio_path, scratch_dir)
+            published = publish(scratch_dir, output_dir_name, STEM_FILES)
+        print(f"Separation complete. Output saved to {output_dir_name}")
+        return {"vocal_file": published[VOCALS_FILE], "accompaniment_file": published[INSTRUMENTAL_FILE]}
+
+    def _separate_cli(self, audio_path, scratch_dir):
         print(f"Starting Demucs high-fidelity separation on {audio_path}...")
         
         # We will dispatch demucs out to a subprocess to prevent threading deadlocks in the Flask reactor
         # The demucs CLI safely handles threading, model downloading, and audio formatting automatically.
         python_exe = sys.executable
         
-        # Create a temporary output location for demucs to work
-        temp_out = os.path.join("output", "temp_demucs")
+        # Let demucs work inside this job's scratch directory
+        temp_out = os.path.join(scratch_dir, "demucs")
         os.makedirs(temp_out, exist_ok=True)
         
         # Command: python -m demucs.separate -n htdemucs --two-stems vocals -d cpu -o <temp_out> <audio_path>
@@ -44,17 +157,15 @@ class AudioSeparation:
             "--two-stems", "vocals",
             "-d", self.device,
             "-o", temp_out,
-            audio_path
         ]
+        if STEM_FORMAT == "flac":
+            command.append("--flac")
+        command.append(audio_path)
         
         print("Executing:", " ".join(command))
-        try:
-            # We enforce a timeout or check=True to block until separated
-            subprocess.run(command, check=True)
-            print("Demucs processing completed successfully.")
-        except subprocess.CalledProcessError as e:
-            print(f"Demucs processing failed with error: {e}")
-            return
+        # We enforce a timeout or check=True to block until separated
+        subprocess.run(command, check=True)
+        print("Demucs processing completed successfully.")
             
         # Demucs creates an output folder structure like: <output>/htdemucs/<track_name>/
         # Extract the track name without extension
@@ -62,40 +173,40 @@ class AudioSeparation:
         demucs_result_dir = os.path.join(temp_out, "htdemucs", track_name)
         
         if not os.path.exists(demucs_result_dir):
-            print(f"Error: Expected demucs output directory not found at {demucs_result_dir}")
-            return
+            raise RuntimeError(f"Expected demucs output directory not found at {demucs_result_dir}")
 
-        # Prepare final output directory
-        final_out_dir = output_dir_name
-        os.makedirs(final_out_dir, exist_ok=True)
+        # Rename into the layout publish() expects; same directory tree, so no copying
+        os.replace(os.path.join(demucs_result_dir, VOCALS_FILE), os.path.join(scratch_dir, VOCALS_FILE))
+        os.replace(os.path.join(demucs_result_dir, f"no_vocals.{STEM_FORMAT}"), os.path.join(scratch_dir, INSTRUMENTAL_FILE)) # Renamed for our API
 
-        # Move vocals.wav and no_vocals.wav to the target directory
-        try:
-            src_vocals = os.path.join(demucs_result_dir, "vocals.wav")
-            src_no_vocals = os.path.join(demucs_result_dir, "no_vocals.wav")
-            
-            dst_vocals = os.path.join(final_out_dir, "vocals.wav")
-            dst_no_vocals = os.path.join(final_out_dir, "instrumental.wav") # Renamed for our API
-            
-            if os.path.exists(src_vocals):
-                shutil.move(src_vocals, dst_vocals)
-                print(f"Saved Vocals to {dst_vocals}")
-            if os.path.exists(src_no_vocals):
-                shutil.move(src_no_vocals, dst_no_vocals)
-                print(f"Saved Instrumental to {dst_no_vocals}")
-                
-            # Cleanup temp demucs output
-            shutil.rmtree(temp_out, ignore_errors=True)
-            print(f"Separation complete. Output saved to {final_out_dir}")
-            
-        except Exception as e:
-            print(f"Error moving separated files: {e}")
+def benchmark(audio_path, output_dir):
+    """Time the CLI path against the segment-parallel engine on the same input."""
+    timings = {}
+    for backend in ("cli", "segmented"):
+        separator = AudioSeparation(backend=backend)
+        if separator.pool:
+            # Load the model up front; the steady-state service doesn't pay for it per song
+            separator.segmented.model_info()
+        started = time.perf_counter()
+        separator.separate(audio_path, os.path.join(output_dir, backend))
+        timings[backend] = time.perf_counter() - started
+        if separator.pool:
+            separator.pool.shutdown()
+
+    print(f"CLI:       {timings['cli']:.1f}s")
+    print(f"Segmented: {timings['segmented']:.1f}s")
+    print(f"Speedup:   {timings['cli'] / timings['segmented']:.2f}x")
+    return timings
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Separate audio into Vocals and Instrumental tracks.")
     parser.add_argument("--input", required=True, help="Input audio file path")
     parser.add_argument("--output", required=True, help="Output directory for separated tracks")
+    parser.add_argument("--benchmark", action="store_true", help="Compare the CLI and segment-parallel backends on --input")
     args = parser.parse_args()
 
-    separator = AudioSeparation()
-    separator.separate(args.input, args.output)
\ No newline at end of file
+    if args.benchmark:
+        benchmark(args.input, args.output)
+    else:
+        separator = AudioSeparation()
+        separator.separate(args.input, args.output)
@@ -0,0 +1,292 @@
+"""Long-lived separation worker processes that keep the demucs model loaded.
+
+Each worker is a separate process, so a wedged torch/demucs run can't
+deadlock the Flask server (the reason separation used to go through a
+`python -m demucs.separate` subprocess), but the interpreter start-up, torch
+import and htdemucs weight load are paid once per worker instead of once
+per song. Workers are recycled after a number of songs, only ever between
+two songs, or when their memory grows past a limit.
+"""
+
+import collections
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+import uuid
+
+MODEL_NAME = "htdemucs"
+# Commands that process a whole song in one call
+SONG_COMMANDS = {"separate_file"}
+
+
+def _rss_mb():
+    """Resident memory of the current process in MB, or None if unknown."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def load_model(device):
+    from demucs.pretrained import get_model
+
+    model = get_model(MODEL_NAME)
+    model.to(device)
+    model.eval()
+    return model
+
+
+def separate_file(model, device, audio_path, output_dir, stem_format="flac"):
+    """Two-stem (vocals / everything else) separation, as the demucs CLI does it."""
+    import torch
+    from demucs.apply import apply_model
+    from demucs.audio import AudioFile, save_audio
+
+    wav = AudioFile(audio_path).read(streams=0, samplerate=model.samplerate, channels=model.audio_channels)
+    ref = wav.mean(0)
+    wav = (wav - ref.mean()) / ref.std()
+    with torch.no_grad():
+        sources = apply_model(model, wav[None], device=device, shifts=1, split=True, overlap=0.25, progress=False)[0]
+    sources = sources * ref.std() + ref.mean()
+
+    vocals_idx = model.sources.index("vocals")
+    vocals = sources[vocals_idx]
+    instrumental = sum(sources[i] for i in range(len(model.sources)) if i != vocals_idx)
+
+    os.makedirs(output_dir, exist_ok=True)
+    # save_audio picks WAV or FLAC from the extension
+    vocals_path = os.path.join(output_dir, f"vocals.{stem_format}")
+    instrumental_path = os.path.join(output_dir, f"instrumental.{stem_format}")
+    save_audio(vocals.cpu(), vocals_path, samplerate=model.samplerate)
+    save_audio(instrumental.cpu(), instrumental_path, samplerate=model.samplerate)
+    return {"vocal_file": vocals_path, "accompaniment_file": instrumental_path}
+
+
+def separate_segment(model, device, chunk):
+    """Separate one (already normalized) slice of a song; returns (vocals, instrumental) arrays."""
+    import torch
+    from demucs.apply import apply_model
+
+    with torch.no_grad():
+        sources = apply_model(model, torch.from_numpy(chunk)[None], device=device, shifts=1, split=True, overlap=0.25, progress=False)[0]
+    vocals_idx = model.sources.index("vocals")
+    instrumental = sum(sources[i] for i in range(len(model.sources)) if i != vocals_idx)
+    return sources[vocals_idx].cpu().numpy(), instrumental.cpu().numpy()
+
+
+def model_info(model):
+    return {"samplerate": model.samplerate, "channels": model.audio_channels, "sources": list(model.sources)}
+
+
+def _worker_main(conn, device, max_jobs, max_rss_mb, num_threads):
+    started = time.time()
+    try:
+        if num_threads:
+            # Several workers share the machine; don't let each grab every core
+            import torch
+            torch.set_num_threads(num_threads)
+        model = load_model(device)
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        return
+    print(f"[separation worker {os.getpid()}] {MODEL_NAME} loaded on {device} in {time.time() - started:.1f}s")
+    conn.send(("ready", None))
+
+    handlers = {
+        "separate_file": lambda args: separate_file(model, device, *args),
+        "separate_segment": lambda args: separate_segment(model, device, *args),
+        "model_info": lambda args: model_info(model),
+    }
+
+    # max_jobs counts songs. A song separated in segments arrives as many
+    # commands carrying the same song key, possibly spread over several
+    # workers and interleaved with another song's.
+    songs_done = 0
+    recent_songs = collections.deque(maxlen=16)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        command, args, song = message
+        if song is not None and song not in recent_songs:
+            if songs_done >= max_jobs:
+                # Recycle between songs, never in the middle of one: hand the
+                # work back so a fresh worker takes the new song from the start
+                print(f"[separation worker {os.getpid()}] retiring after {songs_done} songs")
+                conn.send(("retiring", None, True))
+                return
+            songs_done += 1
+            recent_songs.append(song)
+        try:
+            result = handlers[command](args)
+            reply = ("ok", result)
+        except Exception:
+            reply = ("error", traceback.format_exc())
+
+        # Memory is checked after every command, the song count only once a
+        # whole song is known to be done
+        rss = _rss_mb()
+        over_memory = bool(max_rss_mb and rss is not None and rss > max_rss_mb)
+        retire = over_memory or (command in SONG_COMMANDS and songs_done >= max_jobs)
+        conn.send(reply + (retire,))
+        if retire:
+            print(f"[separation worker {os.getpid()}] retiring after {songs_done} songs (rss {rss or 0:.0f} MB)")
+            return
+
+
+class WorkerGone(Exception):
+    """The worker process had exited before a job could be sent to it."""
+
+
+class SeparationWorker:
+    def __init__(self, ctx, device, max_jobs, max_rss_mb, num_threads=None):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, device, max_jobs, max_rss_mb, num_threads),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout):
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise TimeoutError("Separation worker did not load the model in time")
+        status, detail = self.conn.recv()
+        if status != "ready":
+            raise RuntimeError(f"Separation worker failed to start:\n{detail}")
+        self.ready = True
+
+    def call(self, command, args, timeout, song=None):
+        """Run one job; returns (status, result, retire).
+
+        `retire` is True when the worker exits after this job, whether the
+        job succeeded or not. Status "retiring" means it exited without
+        running the job, because it has done its share of songs.
+        """
+        try:
+            self.conn.send((command, args, song))
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise WorkerGone(str(e))
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"Separation worker timed out after {timeout}s")
+        return self.conn.recv()
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def stop(self, kill=False):
+        if not kill:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=10)
+
+
+class WarmSeparationPool:
+    """A fixed number of warm workers; each request borrows one for its job."""
+
+    def __init__(self, size=1, device="cpu", max_jobs=20, max_rss_mb=0, job_timeout=1800, startup_timeout=600, threads_per_worker=None):
+        self.device = device
+        self.threads_per_worker = threads_per_worker
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.job_timeout = job_timeout
+        self.startup_timeout = startup_timeout
+        # spawn: never fork a process that already has torch/Flask threads
+        self._ctx = mp.get_context("spawn")
+        self._idle = queue.Queue()
+        self.size = size
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        return SeparationWorker(self._ctx, self.device, self.max_jobs, self.max_rss_mb, self.threads_per_worker)
+
+    def _respawn(self, worker, kill=False):
+        worker.stop(kill=kill)
+        return self._spawn()
+
+    def _run(self, worker, command, args, timeout, song):
+        worker.wait_ready(self.startup_timeout)
+        return worker.call(command, args, timeout or self.job_timeout, song)
+
+    def call(self, command, args, timeout=None, song=None):
+        """Run a command in an idle worker.
+
+        `song` identifies the song a command belongs to, so workers are only
+        recycled between songs. Whole-song commands get a key of their own.
+        """
+        if command in SONG_COMMANDS and song is None:
+            song = uuid.uuid4().hex
+        worker = self._idle.get()
+        try:
+            if not worker.alive():
+                # Died while idle (e.g. killed by the OOM killer)
+                print(f"Separation worker {worker.process.pid} exited while idle; starting a new one")
+                worker = self._respawn(worker)
+            try:
+                status, result, retire = self._run(worker, command, args, timeout, song)
+            except WorkerGone:
+                # Exited just before the send, so the job never reached it; retry once
+                worker = self._respawn(worker)
+                status, result, retire = self._run(worker, command, args, timeout, song)
+            if status == "retiring":
+                # The job never ran; a fresh worker has room for the new song
+                worker = self._respawn(worker)
+                status, result, retire = self._run(worker, command, args, timeout, song)
+            if retire:
+                # It exits after this reply (job limit or memory), failed job or not
+                worker = self._respawn(worker)
+        except (TimeoutError, EOFError, OSError, WorkerGone):
+            # Hung or crashed mid-job: the process can't be trusted any more
+            worker = self._respawn(worker, kill=True)
+            raise
+        except RuntimeError:
+            # The model failed to load and the process has exited
+            worker = self._respawn(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+        if status != "ok":
+            raise RuntimeError(f"Separation worker failed:\n{result}")
+        return result
+
+    def warm_up(self):
+        """Wait until every worker has finished loading the model."""
+        workers = [self._idle.get() for _ in range(self.size)]
+        try:
+            for worker in workers:
+                worker.wait_ready(self.startup_timeout)
+        finally:
+            for worker in workers:
+                self._idle.put(worker)
+
+    def separate(self, audio_path, output_dir, stem_format="flac"):
+        return self.call("separate_file", (audio_path, output_dir, stem_format))
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
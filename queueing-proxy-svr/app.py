@@ -1,11 +1,19 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, jsonify, redirect, request, send_file, url_for
 from flask_cors import CORS
 from marshmallow import Schema, fields, ValidationError
 from models import db, Song
 from output_manager import OutputManager
+from job_queue import JobQueue, StageError
+from pipeline import PipelineExecutor
+from events import EventBroker, format_sse, is_terminal_status
+from timeline import Timeline, pack_timeline
+from media import RENDITION_FORMATS, ContentEtags, Renditions, negotiate_format, source_mimetype
+from migrations import upgrade_schema
+from result_cache import ResultCache, save_with_digest
+import os
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor'])
 
 # Database Configuration
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///karaoke.db'
@@ -15,14 +23,24 @@ db.init_app(app)
 # Create tables
 with app.app_context():
     db.create_all()
+    SEARCH_ENABLED = upgrade_schema()
+
+# Every song gets its own directory under shared_data/outputs/<song_id>
+OUTPUTS_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared_data', 'outputs')
 
 # Initialize Output Manager
-output_manager = OutputManager()
+result_cache = ResultCache(OUTPUTS_ROOT)
+event_broker = EventBroker()
+output_manager = OutputManager(result_cache=result_cache, event_broker=event_broker)
 
 class QueueRequestSchema(Schema):
     song_title = fields.Str(required=True)
     original_artist = fields.Str(required=True)
     performer_name = fields.Str(required=True)
+    transcribe_vocals = fields.Bool(load_default=lambda: TRANSCRIBE_VOCALS_DEFAULT)
+    # Known lyrics skip speech recognition: they're only aligned to the vocals
+    lyrics = fields.Str(load_default=None)
+    lyrics_language = fields.Str(load_default=None)
     # music_file is handled separately via request.files
 
 @app.route("/")
@@ -31,9 +49,12 @@ def usage():
     <p>Queueing Proxy Server API</p><p>Use the /queue-request endpoint to queue a request.</p><p>Example: <a href="/queue-request">/queue-request</a></p>
     """
 
+import mimetypes
+import queue
+import re
 import requests
-import os
-import threading
+import shutil
+import subprocess
 import tempfile
 from mutagen import File as MutagenFile
 
@@ -74,71 +95,176 @@ def extract_metadata():
         except OSError:
             pass
 
-def process_song_async(app_context, song_id, save_path, filename, mimetype, output_dir):
-    with app_context:
-        # Call Music Separation Service
-        separation_service_url = "http://localhost:5002/separate"
-        accompanyment_file = None
-        vocal_file = None
-        
-        output_manager.update_song_status(song_id, 'separating')
-        
-        try:
-            print(f"Calling separation service for {save_path}...")
-            response = requests.post(separation_service_url, json={'input_path': save_path, 'output_dir': output_dir})
-            if response.status_code == 200:
-                separation_results = response.json()
-                accompanyment_file = separation_results.get('accompaniment_file')
-                vocal_file = separation_results.get('vocal_file')
-                
-                output_manager.update_song_status(
-                    song_id,
-                    'transcribing',
-                    instrumental_file_path=accompanyment_file,
-                    vocals_file_path=vocal_file
-                )
-                output_manager.update_instrumental_file_path(song_id, accompanyment_file)
-                output_manager.update_vocal_file_path(song_id, vocal_file)
-            else:
-                print(f"Separation service failed: {response.text}")
-                output_manager.update_song_status(song_id, 'error_separation')
-                return
-        except requests.exceptions.RequestException as e:
-            print(f"Failed to connect to separation service: {e}")
-            output_manager.update_song_status(song_id, 'error_separation_connection')
-            return
-        
-        # Call Transcription Service
-        transcription_service_url = "http://localhost:5003/transcribe"
-        lyrics_txt = None
-        lyrics_json = None
-        
-        try:
-            print(f"Calling transcription service...")
+def song_input_path(song_id):
+    """The audio the ML stages should read: the upload, or its FLAC once converted."""
+    song = output_manager.get_song_data(song_id)
+    if not song or not song.original_file_path:
+        raise StageError('error_missing_input', f'No input audio recorded for song {song_id}')
+    return song.original_file_path
+
+def run_conversion_job(job):
+    song_id = job.song_id
+    upload_path = job.payload['upload_path']
+    flac_path = os.path.splitext(upload_path)[0] + ".flac"
+
+    # Convert to lossless FLAC for ML model compatibility; it decodes to the
+    # same samples as WAV at about half the size. Each conversion worker runs
+    # one ffmpeg process at a time, so CONVERSION_WORKERS bounds them.
+    print(f"Converting {upload_path} to .flac for ML compatibility...")
+    try:
+        subprocess.run(["ffmpeg", "-y", "-i", upload_path, "-vn", "-c:a", "flac", flac_path], check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        print(f"FFMPEG conversion failed: {e}")
+        raise StageError('error_conversion', e.stderr.decode('utf-8', errors='replace')[-2000:])
+    except OSError as e:
+        print(f"FFMPEG conversion failed: {e}")
+        raise StageError('error_conversion', str(e))
+    print("Conversion successful.")
+
+    with output_manager.unit_of_work(song_id) as song:
+        if song:
+            song.original_file_path = flac_path
+
+# Ask the separation service to stream the instrumental out as HLS segments
+# while it works, so playback can start before the whole song is done.
+SEPARATION_PROGRESSIVE = os.environ.get('SEPARATION_PROGRESSIVE', '1') == '1'
+
+def run_separation_job(job):
+    song_id = job.song_id
+    save_path = song_input_path(song_id)
+    output_dir = job.payload['output_dir']
+
+    # Call Music Separation Service
+    separation_service_url = "http://localhost:5002/separate"
+
+    try:
+        print(f"Calling separation service for {save_path}...")
+        request_body = {'input_path': save_path, 'output_dir': output_dir, 'progressive': SEPARATION_PROGRESSIVE}
+        response = requests.post(separation_service_url, json=request_body)
+        if response.status_code == 422 and response.json().get('code') == 'progressive_unsupported':
+            # The service's backend can't stream; separate the song without it
+            print(f"Separation service can't stream song {song_id} progressively: {response.json().get('error')}")
+            response = requests.post(separation_service_url, json={**request_body, 'progressive': False})
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to connect to separation service: {e}")
+        raise StageError('error_separation_connection', str(e))
+
+    if response.status_code != 200:
+        print(f"Separation service failed: {response.text}")
+        raise StageError('error_separation', response.text)
+
+    separation_results = response.json()
+    accompanyment_file = separation_results.get('accompaniment_file')
+    vocal_file = separation_results.get('vocal_file')
+
+    with output_manager.unit_of_work(song_id) as song:
+        if song:
+            song.instrumental_file_path = accompanyment_file
+            song.vocals_file_path = vocal_file
+
+def run_transcription_job(job):
+    song_id = job.song_id
+    save_path = song_input_path(song_id)
+    output_dir = job.payload['output_dir']
+
+    lyrics = job.payload.get('lyrics')
+    use_vocals = bool(job.payload.get('transcribe_vocals'))
+    # On a vocals stem, silence means nobody is singing, so the transcription
+    # service can skip those stretches (voice-activity gating). Alignment of
+    # known lyrics ignores it and uses the whole stem; it only applies if the
+    # song is too long to align and gets transcribed instead.
+    vad = use_vocals
+    if use_vocals:
+        # Runs after separation (see pipeline_graph), so the stem exists by now
+        song = output_manager.get_song_data(song_id)
+        if not song or not song.vocals_file_path:
+            raise StageError('error_transcription', 'Vocals stem not available')
+        save_path = song.vocals_file_path
+    filename = os.path.basename(save_path)
+    mimetype = mimetypes.guess_type(save_path)[0] or 'application/octet-stream'
+
+    # Call Transcription Service
+    transcription_service_url = "http://localhost:5003/transcribe"
+
+    try:
+        print(f"Calling transcription service for {save_path}...")
+        if TRANSCRIPTION_PATH_HANDOFF:
+            # Same host/shared volume: pass a reference, not the bytes
+            response = requests.post(transcription_service_url, json={
+                'input_path': save_path,
+                'output_dir': output_dir,
+                'vad': vad,
+                'lyrics': lyrics,
+                'language': job.payload.get('lyrics_language'),
+            })
+        else:
             with open(save_path, 'rb') as f:
                 files={'music_file': (filename, f, mimetype)}
-                response = requests.post(transcription_service_url, data={'output_dir': output_dir}, files=files)
-            if response.status_code == 200:
-                transcription_results = response.json()
-                lyrics_txt = transcription_results.get('lyrics_txt')
-                lyrics_json = transcription_results.get('lyrics_json')
-                
-                output_manager.update_song_status(
-                    song_id, 
-                    'done', 
-                    lyrics_text=lyrics_txt,
-                    lyrics_json=lyrics_json
-                )
-                output_manager.update_lyrics_text(song_id, lyrics_txt)
-                output_manager.update_lyrics_json(song_id, lyrics_json)
-            else:
-                print(f"Transcription service failed: {response.text}")
-                output_manager.update_song_status(song_id, 'error_transcription')
-                return
-        except requests.exceptions.RequestException as e:
-            print(f"Failed to connect to transcription service: {e}")
-            output_manager.update_song_status(song_id, 'error_transcription_connection')
-            return
+                response = requests.post(transcription_service_url, data={
+                    'output_dir': output_dir,
+                    'vad': '1' if vad else '0',
+                    'lyrics': lyrics or '',
+                    'language': job.payload.get('lyrics_language') or '',
+                }, files=files)
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to connect to transcription service: {e}")
+        raise StageError('error_transcription_connection', str(e))
+
+    if response.status_code != 200:
+        print(f"Transcription service failed: {response.text}")
+        raise StageError('error_transcription', response.text)
+
+    transcription_results = response.json()
+    if transcription_results.get('warning'):
+        print(f"Transcription of song {song_id}: {transcription_results['warning']}")
+    lyrics_txt = transcription_results.get('lyrics_txt')
+    lyrics_json = transcription_results.get('lyrics_json')
+
+    with output_manager.unit_of_work(song_id) as song:
+        if song:
+            song.lyrics_text = lyrics_txt
+            song.lyrics_json = lyrics_json
+            song.lyrics_timeline = pack_timeline(lyrics_json) if isinstance(lyrics_json, list) else None
+
+def on_song_done(song_id):
+    # Make the finished artifacts available to future uploads of the same bytes
+    result_cache.store(output_manager.get_song_data(song_id))
+
+def pipeline_graph(needs_conversion, transcribe_vocals):
+    """The stages one song needs, each mapped to the stages it depends on.
+
+    Transcription normally reads the original upload, so it runs alongside
+    separation. Transcribing the isolated vocals makes it wait for the stem.
+    Uploads that aren't WAV are converted first.
+    """
+    graph = {'separation': [], 'transcription': []}
+    if needs_conversion:
+        graph['conversion'] = []
+        graph['separation'].append('conversion')
+        graph['transcription'].append('conversion')
+    if transcribe_vocals:
+        graph['transcription'].append('separation')
+    return graph
+
+# One bounded worker pool per pipeline stage. Sizes are configurable so a busy
+# venue can't start more demucs/ASR jobs at once than the hardware can handle.
+job_queue = JobQueue(
+    lease_seconds=int(os.environ.get('JOB_LEASE_SECONDS', 120)),
+    max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+)
+pipeline = PipelineExecutor(app, job_queue, output_manager, on_song_done=on_song_done)
+pipeline.add_stage('conversion', run_conversion_job, 'converting',
+                   workers=int(os.environ.get('CONVERSION_WORKERS', 2)))
+pipeline.add_stage('separation', run_separation_job, 'separating',
+                   workers=int(os.environ.get('SEPARATION_WORKERS', 1)))
+pipeline.add_stage('transcription', run_transcription_job, 'transcribing',
+                   workers=int(os.environ.get('TRANSCRIPTION_WORKERS', 1)))
+
+# Set to 0 when the transcription service runs on a node without access to
+# shared_data; the audio is then uploaded as multipart instead.
+TRANSCRIPTION_PATH_HANDOFF = os.environ.get('TRANSCRIPTION_PATH_HANDOFF', '1').lower() in ('1', 'true', 'yes')
+TRANSCRIBE_VOCALS_DEFAULT = os.environ.get('TRANSCRIBE_VOCALS_STEM', '0').lower() in ('1', 'true', 'yes')
+
 
 @app.route('/queue_request', methods=['POST'])
 def queue_request():
@@ -174,36 +300,45 @@ def queue_request():
     from werkzeug.utils import secure_filename
     filename = secure_filename(file.filename)
     
-    output_dir_parent = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared_data', 'outputs')
-    output_dir = os.path.join(output_dir_parent, str(song_id))
+    output_dir = os.path.join(OUTPUTS_ROOT, str(song_id))
     os.makedirs(output_dir, exist_ok=True)
     
     save_path = os.path.join(output_dir, filename)
-    file.save(save_path)
+    content_hash = save_with_digest(file, save_path)
 
-    # Convert to WAV for ML model compatibility
-    import subprocess
-    wav_path = os.path.join(output_dir, os.path.splitext(filename)[0] + ".wav")
-    if not filename.lower().endswith('.wav'):
-        print(f"Converting {filename} to .wav for ML compatibility...")
-        try:
-            subprocess.run(["ffmpeg", "-y", "-i", save_path, wav_path], check=True, capture_output=True)
-            save_path = wav_path
-            filename = os.path.basename(wav_path)
-            print("Conversion successful.")
-        except Exception as e:
-            print(f"FFMPEG conversion failed: {e}")
-
-    # Update original_file_path with actual save_path
-    output_manager.update_original_file_path(song_id, save_path)
-
-    # Start ML processing in a background thread so we don't block the UI
-    thread = threading.Thread(
-        target=process_song_async, 
-        args=(app.app_context(), song_id, save_path, filename, file.mimetype, output_dir)
-    )
-    thread.daemon = True
-    thread.start()
+    # Same bytes already processed? Reuse the finished stems and lyrics,
+    # unless the caller supplied lyrics of their own to align.
+    lyrics = (result['lyrics'] or '').strip() or None
+    cached = output_manager.reuse_cached_result(song_id, content_hash) if not lyrics else None
+    if cached:
+        print(f"Cache hit for song {song_id}: reusing results from {cached.output_dir}")
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return jsonify({
+            'song_id': song_id,
+            'song_title': song_title,
+            'original_artist': original_artist,
+            'performer_name': performer_name,
+            'original_music_file': filename,
+            'status': 'done'
+        }), 201
+
+    # Record the actual save_path and upload hash in one commit
+    with output_manager.unit_of_work(song_id) as song:
+        song.original_file_path = save_path
+        song.content_hash = content_hash
+
+    # Hand everything else, including the WAV conversion, to the stage
+    # workers so we don't block the UI. The jobs are persisted, so they
+    # survive a proxy restart.
+    # Alignment always runs against the vocals stem
+    transcribe_vocals = result['transcribe_vocals'] or bool(lyrics)
+    pipeline.submit(song_id, {
+        'upload_path': save_path,
+        'output_dir': output_dir,
+        'transcribe_vocals': transcribe_vocals,
+        'lyrics': lyrics,
+        'lyrics_language': result['lyrics_language'],
+    }, pipeline_graph(not filename.lower().endswith(('.wav', '.flac')), transcribe_vocals))
 
     # Return response immediately
     return jsonify({
@@ -215,24 +350,198 @@ def queue_request():
         'status': 'queued'
     }), 201
 
+LIST_PAGE_SIZE = 100
+LIST_MAX_PAGE_SIZE = 500
+
 @app.route('/list_available_songs')
 def list_available_songs():
-    songs = output_manager.get_all_song_data()
-    return jsonify([{'song_id': song.id, 'song_title': song.title, 'original_artist': song.artist, 'status': song.status, 'owner_id': song.owner_id} for song in songs])
+    """One page of songs. Pass the X-Next-Cursor response header back as
+    ?cursor= to get the next page; it is absent on the last page.
+
+    Optional: limit, sort (id|title|artist), order (asc|desc), status,
+    original_artist, owner_id.
+    """
+    limit = min(request.args.get('limit', LIST_PAGE_SIZE, type=int), LIST_MAX_PAGE_SIZE)
+    try:
+        songs, next_cursor = output_manager.list_songs(
+            limit=max(limit, 1),
+            cursor=request.args.get('cursor'),
+            sort=request.args.get('sort', 'id'),
+            order=request.args.get('order', 'asc'),
+            status=request.args.get('status'),
+            artist=request.args.get('original_artist'),
+            owner_id=request.args.get('owner_id', type=int),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = jsonify([{'song_id': song.id, 'song_title': song.title, 'original_artist': song.artist, 'status': song.status, 'owner_id': song.owner_id} for song in songs])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/search')
+def search_songs():
+    """Ranked search by partial title, artist or a remembered lyric line.
+
+    Every word in ?q= is matched as a prefix. Matches are wrapped in <mark>
+    in the returned title/artist highlights and lyrics snippet.
+    """
+    if not SEARCH_ENABLED:
+        return jsonify({'error': 'Full-text search is not available on this server'}), 503
+    q = request.args.get('q', '')
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    results = output_manager.search_songs(q, limit=max(limit, 1))
+    return jsonify([{
+        'song_id': row.id,
+        'song_title': row.title,
+        'original_artist': row.artist,
+        'status': row.status,
+        'owner_id': row.owner_id,
+        'title_highlight': row.title_highlight,
+        'artist_highlight': row.artist_highlight,
+        'lyrics_snippet': row.lyrics_snippet,
+    } for row in results])
 
 @app.route('/get_song_data')
 def get_song_data():
     song_id = request.args.get('song_id')
     song = output_manager.get_song_data(song_id)
-    return jsonify({'song_id': song.id, 'song_title': song.title, 'original_artist': song.artist, 'status': song.status, 'owner_id': getattr(song, 'owner_id', None), 'lyrics_json': song.lyrics_json, 'lyrics_text': song.lyrics_text})
+    return jsonify({'song_id': song.id, 'song_title': song.title, 'original_artist': song.artist, 'status': song.status, 'stages': pipeline.stage_status(song.id), 'owner_id': getattr(song, 'owner_id', None), 'lyrics_json': song.lyrics_json, 'lyrics_text': song.lyrics_text, 'live_playlist': live_playlist_url(song)})
+
+# Players poll this a few times a second, so keep each answer small
+LYRICS_WINDOW_SPAN = float(os.environ.get('LYRICS_WINDOW_SPAN', 10))
+LYRICS_WINDOW_MAX_SPAN = 120.0
+
+@app.route('/lyrics_window')
+def lyrics_window():
+    """The words sung between t and t + span seconds, found by binary search on the packed timeline."""
+    song_id = request.args.get('song_id', type=int)
+    t = request.args.get('t', type=float)
+    span = request.args.get('span', default=LYRICS_WINDOW_SPAN, type=float)
+    if song_id is None or t is None:
+        return jsonify({'error': 'song_id and t are required'}), 400
+    if not 0 < span <= LYRICS_WINDOW_MAX_SPAN:
+        return jsonify({'error': f'span must be between 0 and {LYRICS_WINDOW_MAX_SPAN:g} seconds'}), 400
+
+    blob = output_manager.get_lyrics_timeline(song_id)
+    if blob is None:
+        return jsonify({'error': 'No lyrics for this song'}), 404
+    timeline = Timeline(blob)
+    first, last = timeline.window(t, span)
+    return jsonify({
+        'song_id': song_id,
+        't': t,
+        'span': span,
+        'first_index': first,
+        'total_words': len(timeline),
+        'words': [timeline.word(i) for i in range(first, last)],
+    })
+
+@app.route('/lyrics_timeline')
+def lyrics_timeline():
+    """The whole packed timeline, for players that do their own lookups."""
+    song_id = request.args.get('song_id', type=int)
+    blob = output_manager.get_lyrics_timeline(song_id) if song_id is not None else None
+    if blob is None:
+        return jsonify({'error': 'No lyrics for this song'}), 404
+    response = Response(blob, mimetype='application/octet-stream')
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/events')
+def song_events():
+    """Server-Sent Events stream of {song_id, status, progress} for one song.
+
+    Sends the current state first, then every change until the song is done
+    or has failed, so clients don't need to poll /get_song_data.
+    """
+    song_id = request.args.get('song_id', type=int)
+    if song_id is None:
+        return jsonify({'error': 'Missing song_id'}), 400
+
+    # Subscribe before reading the current state so no update is missed
+    events = event_broker.subscribe(song_id)
+    song = output_manager.get_song_data(song_id)
+    if not song:
+        event_broker.unsubscribe(song_id, events)
+        return jsonify({'error': 'Song not found'}), 404
+    current = {'song_id': song_id, 'status': song.status, 'progress': pipeline.progress(song_id)}
+
+    def stream():
+        try:
+            yield format_sse(current)
+            if is_terminal_status(current['status']):
+                return
+            while True:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+                if is_terminal_status(event['status']):
+                    return
+        finally:
+            event_broker.unsubscribe(song_id, events)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+# The bytes behind a song id can change (SQLite reuses ids after a delete, and
+# 'original' switches to the converted FLAC), so clients must revalidate every
+# time; the strong ETag (a hash of the contents) keeps that to a cheap 304.
+content_etags = ContentEtags()
+renditions = Renditions()
+
+HLS_DIRNAME = 'hls'
+HLS_PLAYLIST = 'instrumental.m3u8'
+HLS_SEGMENT_NAME = re.compile(r'^seg_\d{5}\.ts$')
+
+def live_playlist_path(song_id):
+    return os.path.join(OUTPUTS_ROOT, str(song_id), HLS_DIRNAME, HLS_PLAYLIST)
+
+def live_playlist_url(song):
+    """URL of the progressive instrumental playlist once its first segment is out, else None."""
+    if not os.path.exists(live_playlist_path(song.id)):
+        return None
+    return url_for('stream_hls', song_id=song.id, name=HLS_PLAYLIST)
+
+@app.route('/hls/<int:song_id>/<name>')
+def stream_hls(song_id, name):
+    """Playlist and segments of the instrumental while it is still being separated."""
+    hls_dir = os.path.dirname(live_playlist_path(song_id))
+    if name == HLS_PLAYLIST:
+        path = os.path.join(hls_dir, name)
+        if not os.path.exists(path):
+            return jsonify({'error': 'Playlist not found'}), 404
+        # The playlist grows until #EXT-X-ENDLIST; players must keep re-fetching it
+        response = send_file(path, mimetype='application/vnd.apple.mpegurl', conditional=True, max_age=0)
+        response.cache_control.no_cache = True
+        return response
+    if not HLS_SEGMENT_NAME.match(name):
+        return jsonify({'error': 'Invalid segment name'}), 400
+    path = os.path.join(hls_dir, name)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Segment not found'}), 404
+    response = send_file(path, mimetype='video/mp2t', conditional=True, etag=content_etags.get(path), max_age=0)
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/stream_audio')
 def stream_audio():
     song_id = request.args.get('song_id')
-    audio_type = request.args.get('type') # 'instrumental', 'vocals', 'original'
+    audio_type = request.args.get('type') # 'instrumental', 'vocals', 'original', 'instrumental_live'
     song = output_manager.get_song_data(song_id)
     if not song:
         return jsonify({'error': 'Song not found'}), 404
+
+    if audio_type == 'instrumental_live':
+        url = live_playlist_url(song)
+        if not url:
+            return jsonify({'error': 'No live playlist for this song'}), 404
+        return redirect(url)
         
     path = None
     if audio_type == 'instrumental':
@@ -243,9 +552,38 @@ def stream_audio():
         path = song.original_file_path
         
     if path and os.path.exists(path):
-        return send_file(path)
+        # Stems are stored lossless; stream a cached lossy rendition unless the
+        # client asks for the source with ?format=source.
+        mimetype = source_mimetype(path)
+        fmt = negotiate_format(request.args.get('format'), request.accept_mimetypes)
+        if fmt != 'source':
+            try:
+                path = renditions.get(path, fmt)
+                mimetype = RENDITION_FORMATS[fmt][0]
+            except (subprocess.CalledProcessError, OSError) as e:
+                print(f"Transcoding {path} to {fmt} failed, serving the source: {e}")
+        # conditional=True gives 206 Partial Content for Range requests (seeking)
+        # and 304 Not Modified when If-None-Match/If-Modified-Since still hold.
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            conditional=True,
+            etag=content_etags.get(path),
+            last_modified=os.path.getmtime(path),
+            max_age=0,
+        )
+        response.cache_control.no_cache = True
+        response.vary.add('Accept')
+        return response
     return jsonify({'error': 'File not found on disk'}), 404
 
+@app.route('/queue_status')
+def queue_status():
+    return jsonify({
+        'depth': job_queue.depth(),
+        'workers': {stage: {'size': pool.size, 'busy': pool.busy} for stage, pool in pipeline.pools.items()},
+    })
+
 @app.route('/remove_song_data')
 def remove_song_data():
     song_id = request.args.get('song_id')
@@ -265,6 +603,7 @@ def find_songs_by_original_artist():
     return jsonify([{'song_id': song.id, 'song_title': song.title, 'original_artist': song.artist, 'status': song.status, 'owner_id': song.owner_id} for song in songs])
 
 def main():
+    pipeline.start_workers()
     app.run(debug=False, port=5001, use_reloader=False)
 
 if __name__ == "__main__":
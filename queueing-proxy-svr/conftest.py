@@ -0,0 +1,15 @@
+import pytest
+from flask import Flask
+
+from models import db
+
+
+@pytest.fixture
+def app():
+    """A Flask app on a fresh in-memory database, with its app context pushed."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
@@ -0,0 +1,48 @@
+import json
+import queue
+import threading
+
+
+def is_terminal_status(status):
+    return status == 'done' or (status or '').startswith('error')
+
+
+def format_sse(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+class EventBroker:
+    """In-process fan-out of song status changes to /events subscribers."""
+
+    def __init__(self, max_backlog=100):
+        self.max_backlog = max_backlog
+        self._subscribers = {} # song_id -> set of queues
+        self._lock = threading.Lock()
+
+    def subscribe(self, song_id):
+        q = queue.Queue(maxsize=self.max_backlog)
+        with self._lock:
+            self._subscribers.setdefault(int(song_id), set()).add(q)
+        return q
+
+    def unsubscribe(self, song_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(int(song_id))
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[int(song_id)]
+
+    def publish(self, song_id, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(int(song_id), ()))
+        for q in subscribers:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                # A stalled client only needs the latest state, not the backlog
+                try:
+                    q.get_nowait()
+                    q.put_nowait(payload)
+                except (queue.Empty, queue.Full):
+                    pass
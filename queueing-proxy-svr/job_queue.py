@@ -0,0 +1,281 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+
+from sqlalchemy import and_, func, or_, update
+
+from models import db, Job
+
+
+class StageError(Exception):
+    """Raised by a stage handler when a job fails.
+
+    `status` is the song status to record once the job has used up its retries.
+    """
+
+    def __init__(self, status, message=""):
+        super().__init__(message or status)
+        self.status = status
+
+
+class JobQueue:
+    """Durable job queue persisted in the `job` table of karaoke.db.
+
+    Workers claim a job by taking a time-limited lease on it. A worker that
+    dies (or a proxy restart) simply lets its lease run out, after which the
+    job can be claimed again, so nothing in flight is lost.
+    """
+
+    def __init__(self, lease_seconds=120, max_attempts=3, retry_backoff=5.0):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        # Wakes idle workers as soon as something is enqueued instead of
+        # waiting for their next poll.
+        self._wakeup = threading.Condition()
+
+    def enqueue(self, song_id, stage, payload=None, max_attempts=None, depends_on=None):
+        return self.enqueue_graph(song_id, {stage: depends_on or []}, payload, max_attempts)[0]
+
+    def enqueue_graph(self, song_id, graph, payload=None, max_attempts=None):
+        """Create a job for each stage in `graph` (stage -> stages it depends on), in one commit.
+
+        Jobs with dependencies start out 'blocked' until they are released.
+        Returns the jobs in the order of `graph`.
+        """
+        now = time.time()
+        jobs = [
+            Job(
+                song_id=song_id,
+                stage=stage,
+                status='blocked' if depends_on else 'pending',
+                depends_on=list(depends_on),
+                payload=payload or {},
+                attempts=0,
+                max_attempts=max_attempts or self.max_attempts,
+                available_at=now,
+            )
+            for stage, depends_on in graph.items()
+        ]
+        db.session.add_all(jobs)
+        db.session.commit()
+        self.notify()
+        return jobs
+
+    def notify(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def wait(self, timeout):
+        with self._wakeup:
+            self._wakeup.wait(timeout)
+
+    def _claimable(self, stage, now):
+        return and_(
+            Job.stage == stage,
+            or_(
+                and_(Job.status == 'pending', Job.available_at <= now),
+                # A lease that ran out means the worker died; retry it only
+                # while it has attempts left (see expire())
+                and_(Job.status == 'leased', Job.lease_expires_at < now, Job.attempts < Job.max_attempts),
+            ),
+        )
+
+    def _exhausted(self, stage, now):
+        return and_(
+            Job.stage == stage,
+            Job.status == 'leased',
+            Job.lease_expires_at < now,
+            Job.attempts >= Job.max_attempts,
+        )
+
+    def claim(self, stage, worker_id):
+        """Lease the oldest claimable job for `stage`, or return None."""
+        now = time.time()
+        candidate_ids = db.session.execute(
+            db.select(Job.id).where(self._claimable(stage, now)).order_by(Job.id).limit(5)
+        ).scalars().all()
+
+        for job_id in candidate_ids:
+            # Compare-and-set: only one worker can move this row into its lease.
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, self._claimable(stage, now))
+                .values(
+                    status='leased',
+                    lease_owner=worker_id,
+                    lease_expires_at=now + self.lease_seconds,
+                    attempts=Job.attempts + 1,
+                    updated_at=now,
+                )
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return db.session.get(Job, job_id)
+        return None
+
+    def expire(self, stage):
+        """Fail the jobs whose lease ran out on their last attempt and return them.
+
+        Their workers died every time (e.g. killed for running out of
+        memory), so there is nobody left to call fail() for them.
+        """
+        now = time.time()
+        job_ids = db.session.execute(db.select(Job.id).where(self._exhausted(stage, now))).scalars().all()
+        given_up = []
+        for job_id in job_ids:
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, self._exhausted(stage, now))
+                .values(
+                    status='failed',
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    last_error='Lease expired on the last attempt',
+                    updated_at=now,
+                )
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                given_up.append(db.session.get(Job, job_id))
+        return given_up
+
+    def heartbeat(self, job_id, worker_id):
+        """Extend the lease on a job that is still being worked on."""
+        now = time.time()
+        result = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'leased', Job.lease_owner == worker_id)
+            .values(lease_expires_at=now + self.lease_seconds, updated_at=now)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def complete(self, job_id, worker_id):
+        result = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'leased', Job.lease_owner == worker_id)
+            .values(status='done', lease_owner=None, lease_expires_at=None, updated_at=time.time())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def fail(self, job_id, worker_id, error):
+        """Record a failed attempt.
+
+        Returns True if the job will be retried, False if it has used up its
+        attempts, and None if this worker no longer holds the lease.
+        """
+        job = db.session.get(Job, job_id)
+        if not job or job.status != 'leased' or job.lease_owner != worker_id:
+            return None
+
+        now = time.time()
+        job.last_error = str(error)
+        job.lease_owner = None
+        job.lease_expires_at = None
+        retry = job.attempts < job.max_attempts
+        if retry:
+            job.status = 'pending'
+            job.available_at = now + self.retry_backoff * (2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+        db.session.commit()
+        return retry
+
+    def depth(self):
+        """Number of jobs per stage and status, e.g. {'separation': {'pending': 3}}."""
+        rows = db.session.execute(
+            db.select(Job.stage, Job.status, func.count(Job.id)).group_by(Job.stage, Job.status)
+        ).all()
+        stats = {}
+        for stage, status, count in rows:
+            stats.setdefault(stage, {})[status] = count
+        return stats
+
+
+class WorkerPool:
+    """A fixed number of threads that claim and run jobs for one stage."""
+
+    def __init__(self, app, queue, stage, handler, size=1, on_complete=None, on_give_up=None, poll_interval=2.0):
+        self.app = app
+        self.queue = queue
+        self.stage = stage
+        self.handler = handler
+        self.size = size
+        self.on_complete = on_complete
+        self.on_give_up = on_give_up
+        self.poll_interval = poll_interval
+        self.busy = 0
+        self._busy_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.size):
+            worker_id = f"{self.stage}-{os.getpid()}-{i}-{uuid.uuid4().hex[:6]}"
+            thread = threading.Thread(target=self._run, args=(worker_id,), name=worker_id)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        print(f"Started {self.size} {self.stage} worker(s)")
+
+    def stop(self):
+        self._stop.set()
+        self.queue.notify()
+
+    def _run(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    job = self.queue.claim(self.stage, worker_id)
+                    if job is None:
+                        ran = False
+                        for expired in self.queue.expire(self.stage):
+                            print(f"[{worker_id}] Giving up on {self.stage} job {expired.id}: lease expired on its last attempt")
+                            if self.on_give_up:
+                                self.on_give_up(expired, RuntimeError(expired.last_error))
+                    else:
+                        ran = True
+                        self._process(job, worker_id)
+            except Exception as e:
+                print(f"[{worker_id}] Worker loop error: {e}")
+                traceback.print_exc()
+                ran = False
+            if not ran:
+                self.queue.wait(self.poll_interval)
+
+    def _heartbeat(self, job_id, worker_id, done):
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not done.wait(interval):
+            try:
+                with self.app.app_context():
+                    self.queue.heartbeat(job_id, worker_id)
+            except Exception as e:
+                print(f"[{worker_id}] Lease heartbeat for job {job_id} failed: {e}")
+
+    def _process(self, job, worker_id):
+        job_id = job.id
+        print(f"[{worker_id}] Claimed {self.stage} job {job_id} for song {job.song_id} (attempt {job.attempts}/{job.max_attempts})")
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, worker_id, done))
+        heartbeat.daemon = True
+        heartbeat.start()
+        with self._busy_lock:
+            self.busy += 1
+        try:
+            self.handler(job)
+        except Exception as e:
+            print(f"[{worker_id}] {self.stage} job {job_id} failed: {e}")
+            db.session.rollback()
+            if self.queue.fail(job_id, worker_id, e) is False and self.on_give_up:
+                self.on_give_up(db.session.get(Job, job_id), e)
+            return
+        finally:
+            done.set()
+            with self._busy_lock:
+                self.busy -= 1
+        if self.queue.complete(job_id, worker_id) and self.on_complete:
+            self.on_complete(db.session.get(Job, job_id))
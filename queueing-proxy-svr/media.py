@@ -0,0 +1,118 @@
+import hashlib
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ContentEtags:
+    """Strong ETags derived from file contents, memoized per file version.
+
+    Stems never change once written, so hashing each one once per
+    (path, size, mtime) is enough; later requests are a dict lookup.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._etags = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            etag = self._etags.get(key)
+            if etag:
+                self._etags.move_to_end(key)
+                return etag
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        etag = digest.hexdigest()[:32]
+
+        with self._lock:
+            self._etags[key] = etag
+            while len(self._etags) > self.max_entries:
+                self._etags.popitem(last=False)
+        return etag
+
+
+# Lossy streaming copies of the lossless stems: (mimetype, extension, ffmpeg args)
+RENDITION_FORMATS = {
+    'opus': ('audio/ogg', '.opus', ['-c:a', 'libopus', '-b:a', os.environ.get('OPUS_BITRATE', '128k'), '-f', 'ogg']),
+    # faststart puts the index up front so players can seek with Range requests
+    'aac': ('audio/mp4', '.m4a', ['-c:a', 'aac', '-b:a', os.environ.get('AAC_BITRATE', '192k'), '-movflags', '+faststart', '-f', 'mp4']),
+}
+RENDITIONS_DIRNAME = '.renditions'
+SOURCE_MIMETYPES = {'.flac': 'audio/flac', '.wav': 'audio/wav'}
+
+
+def negotiate_format(requested, accept_mimetypes):
+    """Choose 'opus', 'aac' or 'source' for a stream request.
+
+    An explicit ?format= wins; otherwise the Accept header decides, with AAC
+    as the default because every browser can play it.
+    """
+    if requested in ('source', 'lossless', 'flac'):
+        return 'source'
+    if requested in RENDITION_FORMATS:
+        return requested
+    best = accept_mimetypes.best_match(['audio/mp4', 'audio/ogg', 'audio/flac'], default='audio/mp4')
+    return {'audio/ogg': 'opus', 'audio/flac': 'source'}.get(best, 'aac')
+
+
+def source_mimetype(path):
+    return SOURCE_MIMETYPES.get(os.path.splitext(path)[1].lower())
+
+
+class Renditions:
+    """Transcodes a stem to a streaming format on first request and keeps the result.
+
+    Renditions live in a directory next to their stem, so they are removed
+    with the song (or with the shared cache entry) and never need to be
+    regenerated by re-running separation.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, source, fmt):
+        base = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(os.path.dirname(source), RENDITIONS_DIRNAME, base + RENDITION_FORMATS[fmt][1])
+
+    def _fresh(self, target, source):
+        try:
+            return os.path.getmtime(target) >= os.path.getmtime(source)
+        except OSError:
+            return False
+
+    def get(self, source, fmt):
+        """Path of the `fmt` rendition of `source`, transcoding it if needed."""
+        target = self.path_for(source, fmt)
+        if self._fresh(target, source):
+            return target
+        with self._lock:
+            lock = self._locks.setdefault(target, threading.Lock())
+        # One transcode per rendition; concurrent requests wait for it
+        with lock:
+            if self._fresh(target, source):
+                return target
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = target + '.tmp'
+            command = ['ffmpeg', '-y', '-loglevel', 'error', '-i', source, '-vn'] + RENDITION_FORMATS[fmt][2] + [tmp]
+            print(f"Transcoding {source} to {fmt}...")
+            try:
+                subprocess.run(command, check=True, capture_output=True)
+                os.replace(tmp, target)
+            finally:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+        return target
@@ -0,0 +1,78 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+
+from models import db
+
+# db.create_all() creates missing tables but never alters existing ones, so
+# columns and indexes added to models.py after a karaoke.db was first created
+# are applied here. Every step is idempotent and safe to run on each startup.
+ADDED_COLUMNS = [
+    ('song', 'content_hash', 'VARCHAR(64)'),
+    ('song', 'lyrics_timeline', 'BLOB'),
+    ('song', 'cache_ref', 'VARCHAR(64)'),
+]
+
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS ix_song_content_hash ON song (content_hash)',
+    'CREATE INDEX IF NOT EXISTS ix_song_title ON song (title)',
+    'CREATE INDEX IF NOT EXISTS ix_song_artist ON song (artist)',
+    'CREATE INDEX IF NOT EXISTS ix_song_status ON song (status)',
+]
+
+# Full-text index over song titles, artists and lyrics. It is an external
+# content table over `song`, so it stores only the index, and the triggers
+# keep it in sync with every insert/update/delete, whichever code path
+# (e.g. update_lyrics_text) made the change. Status updates don't touch it.
+SONG_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE song_fts USING fts5("
+    "title, artist, lyrics_text, content='song', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+SONG_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS song_fts_ai AFTER INSERT ON song BEGIN
+        INSERT INTO song_fts(rowid, title, artist, lyrics_text)
+        VALUES (new.id, new.title, new.artist, new.lyrics_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS song_fts_ad AFTER DELETE ON song BEGIN
+        INSERT INTO song_fts(song_fts, rowid, title, artist, lyrics_text)
+        VALUES ('delete', old.id, old.title, old.artist, old.lyrics_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS song_fts_au AFTER UPDATE OF title, artist, lyrics_text ON song BEGIN
+        INSERT INTO song_fts(song_fts, rowid, title, artist, lyrics_text)
+        VALUES ('delete', old.id, old.title, old.artist, old.lyrics_text);
+        INSERT INTO song_fts(rowid, title, artist, lyrics_text)
+        VALUES (new.id, new.title, new.artist, new.lyrics_text);
+    END""",
+]
+
+
+def create_search_index(conn):
+    """Create the song_fts index and triggers. Returns False if SQLite lacks FTS5."""
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='song_fts'")).first()
+    try:
+        if not exists:
+            print("Migrating karaoke.db: building full-text search index")
+            conn.execute(text(SONG_FTS_TABLE))
+            # Index the songs that already exist
+            conn.execute(text("INSERT INTO song_fts(song_fts) VALUES ('rebuild')"))
+        for statement in SONG_FTS_TRIGGERS:
+            conn.execute(text(statement))
+    except OperationalError as e:
+        print(f"Full-text search unavailable (SQLite built without FTS5?): {e}")
+        return False
+    return True
+
+
+def upgrade_schema():
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table, column, column_type in ADDED_COLUMNS:
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column not in existing:
+                print(f"Migrating karaoke.db: adding {table}.{column}")
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+        for statement in INDEXES:
+            conn.execute(text(statement))
+    with db.engine.begin() as conn:
+        return create_search_index(conn)
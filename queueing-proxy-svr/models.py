@@ -1,18 +1,58 @@
+import os
+import sqlite3
+import time
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import deferred
 
 db = SQLAlchemy()
 
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 30000))
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers (UI requests) proceed while a worker thread writes,
+    # and synchronous=NORMAL is durable in WAL mode while avoiding an fsync
+    # per commit. busy_timeout makes writers wait for the lock instead of
+    # failing with "database is locked".
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
 class Song(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    title = db.Column(db.String(100))
-    artist = db.Column(db.String(100))
-    status = db.Column(db.String(20)) # queued, separating, transcribing, done
+    title = db.Column(db.String(100), index=True)
+    artist = db.Column(db.String(100), index=True)
+    status = db.Column(db.String(20), index=True) # queued, separating, transcribing, done
     original_file_path = db.Column(db.String(200))
     vocals_file_path = db.Column(db.String(200))
     instrumental_file_path = db.Column(db.String(200))
     lyrics_json = db.Column(db.JSON)
     lyrics_text = db.Column(db.Text)
+    content_hash = db.Column(db.String(64), index=True) # sha256 of the uploaded bytes
+    cache_ref = db.Column(db.String(64)) # the CachedResult this song holds a reference on, if any
+    # lyrics_json packed for time lookups (see timeline.py); only loaded when asked for
+    lyrics_timeline = deferred(db.Column(db.LargeBinary))
+
+class CachedResult(db.Model):
+    # Finished artifacts for one distinct upload, shared by every song whose
+    # upload had the same bytes, stored under outputs/cache/<content_hash>.
+    # ref_count is the number of songs using them (Song.cache_ref).
+    content_hash = db.Column(db.String(64), primary_key=True)
+    output_dir = db.Column(db.String(200))
+    original_file_path = db.Column(db.String(200))
+    vocals_file_path = db.Column(db.String(200))
+    instrumental_file_path = db.Column(db.String(200))
+    lyrics_json = db.Column(db.JSON)
+    lyrics_text = db.Column(db.Text)
+    ref_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.Float, default=time.time)
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -21,4 +61,24 @@ class User(db.Model):
     password = db.Column(db.String(100))
     # lastname = db.Column(db.String(100))
     # firstname = db.Column(db.String(100))
-    
\ No newline at end of file
+    
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    song_id = db.Column(db.Integer, db.ForeignKey('song.id'), index=True)
+    stage = db.Column(db.String(20)) # separation, transcription
+    status = db.Column(db.String(20), default='pending') # blocked, pending, leased, done, failed, cancelled
+    depends_on = db.Column(db.JSON) # stages of the same song that must be done first
+    payload = db.Column(db.JSON)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    available_at = db.Column(db.Float, default=time.time) # not claimable before this (retry backoff)
+    lease_owner = db.Column(db.String(64))
+    lease_expires_at = db.Column(db.Float)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.Float, default=time.time)
+    updated_at = db.Column(db.Float, default=time.time, onupdate=time.time)
+
+    __table_args__ = (
+        db.Index('ix_job_stage_status_available', 'stage', 'status', 'available_at'),
+    )
@@ -1,6 +1,71 @@
-from models import db, Song
+import base64
+import json
+import re
+from contextlib import contextmanager
+from sqlalchemy import and_, or_, text
+from models import db, Job, Song
+from timeline import pack_timeline
+
+# Only the columns the song list views need; never lyrics_json/lyrics_text
+SONG_SUMMARY_COLUMNS = (Song.id, Song.title, Song.artist, Song.status, Song.owner_id)
+SONG_SORT_COLUMNS = {'id': Song.id, 'title': Song.title, 'artist': Song.artist}
+
+def encode_cursor(sort_value, song_id):
+    raw = json.dumps([sort_value, song_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        sort_value, song_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return sort_value, int(song_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+SEARCH_SQL = text("""
+    SELECT song.id, song.title, song.artist, song.status, song.owner_id,
+           highlight(song_fts, 0, '<mark>', '</mark>') AS title_highlight,
+           highlight(song_fts, 1, '<mark>', '</mark>') AS artist_highlight,
+           snippet(song_fts, 2, '<mark>', '</mark>', '…', 12) AS lyrics_snippet,
+           bm25(song_fts, 10.0, 5.0, 1.0) AS rank
+    FROM song_fts JOIN song ON song.id = song_fts.rowid
+    WHERE song_fts MATCH :match
+    ORDER BY rank
+    LIMIT :limit
+""")
+
+def build_match_query(q):
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    "gamb kenny" -> '"gamb"* "kenny"*'. Each term is quoted so user input
+    can't inject FTS5 operators.
+    """
+    terms = re.findall(r'\w+', q or '')
+    return ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+def _after(column, value, song_id, descending):
+    """Keyset predicate: rows strictly after (value, song_id) in sort order."""
+    if column is Song.id:
+        return Song.id < song_id if descending else Song.id > song_id
+    tie = and_(column == value, Song.id < song_id if descending else Song.id > song_id)
+    if value is None:
+        # NULLs sort first ascending and last descending in SQLite
+        if descending:
+            return and_(column.is_(None), Song.id < song_id)
+        return or_(column.isnot(None), and_(column.is_(None), Song.id > song_id))
+    if descending:
+        return or_(column < value, tie, column.is_(None))
+    return or_(column > value, tie)
 
 class OutputManager:
+    def __init__(self, result_cache=None, event_broker=None):
+        self.result_cache = result_cache
+        self.event_broker = event_broker
+
+    def publish_status(self, song_id, status, progress=None):
+        """Push a status/progress event to anyone watching /events for this song."""
+        if self.event_broker and song_id is not None:
+            self.event_broker.publish(song_id, {'song_id': int(song_id), 'status': status, 'progress': progress})
+
     def add_song_data(self, title, artist, original_file_path):
         new_song = Song(
             title=title,
@@ -12,6 +77,26 @@ class OutputManager:
         db.session.commit()
         return new_song
 
+    def reuse_cached_result(self, song_id, content_hash):
+        """Finish a new song with the cached result of an identical earlier upload.
+
+        Returns the cache entry, or None on a miss, leaving the song as it was.
+        """
+        cached = self.result_cache.acquire(content_hash) if self.result_cache else None
+        if cached:
+            self.update_song_status(
+                song_id,
+                'done',
+                content_hash=content_hash,
+                cache_ref=content_hash,
+                original_file_path=cached.original_file_path,
+                instrumental_file_path=cached.instrumental_file_path,
+                vocals_file_path=cached.vocals_file_path,
+                lyrics_json=cached.lyrics_json,
+                lyrics_text=cached.lyrics_text
+            )
+        return cached
+
     def get_song_data(self, song_id):
         return Song.query.get(song_id)
 
@@ -21,23 +106,112 @@ class OutputManager:
     def remove_song_data(self, song_id):
         song = Song.query.get(song_id)
         if song:
+            if self.result_cache:
+                self.result_cache.release(song)
+            # Every job, finished ones included: SQLite can hand the id to the
+            # next song, which would otherwise inherit their stage statuses.
+            Job.query.filter(Job.song_id == song.id).delete(synchronize_session=False)
             db.session.delete(song)
             db.session.commit()
 
+    def list_songs(self, limit=100, cursor=None, sort='id', order='asc', status=None, artist=None, owner_id=None):
+        """One keyset-paginated page of song summaries.
+
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        Pages are addressed by the last (sort value, id) seen rather than an
+        OFFSET, so every page costs the same, however deep into the catalog.
+        """
+        column = SONG_SORT_COLUMNS.get(sort)
+        if column is None:
+            raise ValueError(f"Unsupported sort: {sort}")
+        descending = order == 'desc'
+
+        query = db.select(*SONG_SUMMARY_COLUMNS)
+        if status is not None:
+            query = query.where(Song.status == status)
+        if artist is not None:
+            query = query.where(Song.artist == artist)
+        if owner_id is not None:
+            query = query.where(Song.owner_id == owner_id)
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor)
+            query = query.where(_after(column, sort_value, last_id, descending))
+
+        if descending:
+            query = query.order_by(column.desc(), Song.id.desc())
+        else:
+            query = query.order_by(column.asc(), Song.id.asc())
+
+        # Fetch one extra row to know whether there is another page
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, column.key), last.id)
+        return rows, next_cursor
+
+    def search_songs(self, q, limit=20):
+        """Ranked full-text search over title, artist and lyrics (best first)."""
+        match = build_match_query(q)
+        if not match:
+            return []
+        return db.session.execute(SEARCH_SQL, {'match': match, 'limit': limit}).all()
+
     def find_song_by_title(self, song_title):
-        return Song.query.filter_by(title=song_title).all()
+        return db.session.execute(db.select(*SONG_SUMMARY_COLUMNS).where(Song.title == song_title)).all()
 
     def find_songs_by_original_artist(self, original_artist):
-        return Song.query.filter_by(artist=original_artist).all()
+        return db.session.execute(db.select(*SONG_SUMMARY_COLUMNS).where(Song.artist == original_artist)).all()
     
-    def update_song_status(self, song_id, status, **kwargs):
+    def get_lyrics_timeline(self, song_id):
+        """The packed lyrics timeline of a song, or None if it has no lyrics.
+
+        Songs transcribed before timelines existed (or reusing cached lyrics)
+        get theirs built from lyrics_json and stored on first request.
+        """
+        blob = db.session.execute(db.select(Song.lyrics_timeline).where(Song.id == song_id)).scalar()
+        if blob is not None:
+            return blob
+        lyrics_json = db.session.execute(db.select(Song.lyrics_json).where(Song.id == song_id)).scalar()
+        if not isinstance(lyrics_json, list):
+            return None
+        blob = pack_timeline(lyrics_json)
+        db.session.execute(db.update(Song).where(Song.id == song_id).values(lyrics_timeline=blob))
+        db.session.commit()
+        return blob
+
+    @contextmanager
+    def unit_of_work(self, song_id, progress=None):
+        """Batch several field changes to one song into one fetch and one commit.
+
+            with output_manager.unit_of_work(song_id) as song:
+                if song:
+                    song.vocals_file_path = ...
+                    song.instrumental_file_path = ...
+
+        Yields None if the song no longer exists. A status change is
+        published to /events subscribers after the commit.
+        """
         song = Song.query.get(song_id)
-        if song:
-            song.status = status
-            for key, value in kwargs.items():
-                if hasattr(song, key):
-                    setattr(song, key, value)
-            db.session.commit()
+        previous_status = song.status if song else None
+        try:
+            yield song
+            if song:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if song and song.status != previous_status:
+            self.publish_status(song_id, song.status, progress)
+
+    def update_song_status(self, song_id, status, progress=None, **kwargs):
+        with self.unit_of_work(song_id, progress=progress) as song:
+            if song:
+                song.status = status
+                for key, value in kwargs.items():
+                    if hasattr(song, key):
+                        setattr(song, key, value)
         return song
     
     def update_lyrics_text(self, song_id, lyrics_text):
@@ -51,6 +225,7 @@ class OutputManager:
         song = Song.query.get(song_id)
         if song:
             song.lyrics_json = lyrics_json
+            song.lyrics_timeline = None # rebuilt from the new lyrics on next lookup
             db.session.commit()
         return song 
 
@@ -0,0 +1,126 @@
+import time
+
+from sqlalchemy import update
+
+from job_queue import StageError, WorkerPool
+from models import db, Job, Song
+
+
+class PipelineExecutor:
+    """Runs each song's processing stages as a small DAG on the job queue.
+
+    Every stage of a song is persisted as its own job. Stages without
+    dependencies are claimable straight away, so independent stages run in
+    parallel on their own worker pools; a stage with dependencies waits in
+    the 'blocked' state until all of them are done.
+    """
+
+    def __init__(self, app, queue, output_manager, on_song_done=None):
+        self.app = app
+        self.queue = queue
+        self.output_manager = output_manager
+        self.on_song_done = on_song_done
+        self.stages = {} # stage name -> song status while it runs, in pipeline order
+        self.pools = {}
+
+    def add_stage(self, name, handler, running_status, workers=1):
+        self.stages[name] = running_status
+        self.pools[name] = WorkerPool(
+            self.app, self.queue, name, self._wrap(handler),
+            size=workers,
+            on_complete=self._on_complete,
+            on_give_up=self._on_give_up,
+        )
+
+    def start_workers(self):
+        for pool in self.pools.values():
+            pool.start()
+
+    def submit(self, song_id, payload, graph):
+        """Create the song's jobs. `graph` maps each stage it needs to that stage's dependencies."""
+        # In pipeline order, ignoring dependencies on stages the song skips
+        self.queue.enqueue_graph(song_id, {
+            stage: [dep for dep in graph[stage] if dep in graph]
+            for stage in self.stages if stage in graph
+        }, payload)
+
+    def stage_status(self, song_id):
+        jobs = Job.query.filter_by(song_id=song_id).order_by(Job.id).all()
+        # Latest job per stage wins in case a song was ever resubmitted
+        return {job.stage: job.status for job in jobs}
+
+    def progress(self, song_id, statuses=None):
+        """Fraction of the song's stages that are done, 0.0 - 1.0."""
+        statuses = statuses if statuses is not None else self.stage_status(song_id)
+        if not statuses:
+            return 0.0
+        return sum(1 for status in statuses.values() if status == 'done') / len(statuses)
+
+    def _wrap(self, handler):
+        def run(job):
+            self._refresh_song_status(job.song_id)
+            handler(job)
+        return run
+
+    def _on_complete(self, job):
+        song_id = job.song_id
+        statuses = self.stage_status(song_id)
+        done = {stage for stage, status in statuses.items() if status == 'done'}
+
+        released = False
+        for blocked in Job.query.filter_by(song_id=song_id, status='blocked').all():
+            if set(blocked.depends_on or []) <= done:
+                result = db.session.execute(
+                    update(Job)
+                    .where(Job.id == blocked.id, Job.status == 'blocked')
+                    .values(status='pending', available_at=time.time(), updated_at=time.time())
+                )
+                released = released or result.rowcount == 1
+        db.session.commit()
+        if released:
+            self.queue.notify()
+
+        self._refresh_song_status(song_id)
+
+    def _on_give_up(self, job, error):
+        """Fail the song and cancel its stages that have not started yet."""
+        if job is None:
+            return
+        db.session.execute(
+            update(Job)
+            .where(Job.song_id == job.song_id, Job.status.in_(['blocked', 'pending']))
+            .values(status='cancelled', updated_at=time.time())
+        )
+        db.session.commit()
+        status = error.status if isinstance(error, StageError) else f"error_{job.stage}"
+        self.output_manager.update_song_status(job.song_id, status)
+
+    def _refresh_song_status(self, song_id):
+        song = Song.query.get(song_id)
+        if not song or (song.status or '').startswith('error'):
+            return
+        statuses = self.stage_status(song_id)
+
+        if statuses and all(status == 'done' for status in statuses.values()):
+            # Only one worker gets to finish the song, even if two stages
+            # complete at the same moment.
+            result = db.session.execute(
+                update(Song).where(Song.id == song_id, Song.status != 'done').values(status='done')
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                if self.on_song_done:
+                    self.on_song_done(song_id)
+                self.output_manager.publish_status(song_id, 'done', 1.0)
+            return
+
+        status = 'queued'
+        for stage, running_status in self.stages.items():
+            if statuses.get(stage) == 'leased':
+                status = running_status
+                break
+        progress = self.progress(song_id, statuses)
+        if song.status != status:
+            self.output_manager.update_song_status(song_id, status, progress=progress)
+        else:
+            self.output_manager.publish_status(song_id, status, progress)
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import shutil
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, CachedResult
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def save_with_digest(file_storage, save_path):
+    """Write an uploaded file to disk and return the sha256 of its bytes.
+
+    The digest is computed from the same chunks being written, so the upload
+    is only read once.
+    """
+    digest = hashlib.sha256()
+    with open(save_path, 'wb') as out:
+        while True:
+            chunk = file_storage.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+        # The upload is only acknowledged once it is safely on disk; all
+        # further processing happens in the persisted pipeline.
+        out.flush()
+        os.fsync(out.fileno())
+    return digest.hexdigest()
+
+
+# Song/CachedResult columns that point at shared artifact files
+ARTIFACT_COLUMNS = ('original_file_path', 'vocals_file_path', 'instrumental_file_path')
+CACHE_DIRNAME = 'cache'
+
+
+class ResultCache:
+    """Content-addressed store of finished separation/transcription results.
+
+    When the first song to process a given upload finishes, its stems move
+    to outputs/cache/<content_hash>, outside any song's directory, so song
+    ids that SQLite hands out again can never touch them. Later songs with
+    identical bytes reuse those paths. Every song holding a reference
+    records the entry in Song.cache_ref; the directory is only deleted when
+    the last of them is removed.
+    """
+
+    def __init__(self, outputs_root):
+        self.outputs_root = os.path.abspath(outputs_root)
+        self.cache_root = os.path.join(self.outputs_root, CACHE_DIRNAME)
+
+    def acquire(self, content_hash):
+        """Take a reference on the cached result for `content_hash`, if any.
+
+        The caller records the reference by setting the song's cache_ref.
+        """
+        if not content_hash:
+            return None
+        result = db.session.execute(
+            update(CachedResult)
+            .where(CachedResult.content_hash == content_hash, CachedResult.ref_count > 0)
+            .values(ref_count=CachedResult.ref_count + 1)
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            return None
+        return db.session.get(CachedResult, content_hash)
+
+    def store(self, song):
+        """Move a song that just finished into the cache and make it the first reference."""
+        if not song or not song.content_hash or song.cache_ref:
+            return None
+        if db.session.get(CachedResult, song.content_hash):
+            # An identical upload finished first; this song keeps its own copy.
+            return None
+        # Claim the hash with an unusable entry (ref_count 0) first, so of two
+        # identical uploads finishing together only one moves its files.
+        entry = CachedResult(content_hash=song.content_hash, ref_count=0)
+        db.session.add(entry)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return None
+
+        entry.output_dir = self.entry_dir(song.content_hash)
+        try:
+            moved = self._move_into(entry.output_dir, song)
+        except OSError as e:
+            print(f"Could not move song {song.id} into the result cache: {e}")
+            db.session.delete(entry)
+            db.session.commit()
+            return None
+        for column, path in moved.items():
+            setattr(song, column, path)
+        for column in ARTIFACT_COLUMNS:
+            setattr(entry, column, getattr(song, column))
+        entry.lyrics_json = song.lyrics_json
+        entry.lyrics_text = song.lyrics_text
+        entry.ref_count = 1
+        song.cache_ref = song.content_hash
+        db.session.commit()
+        return entry
+
+    def entry_dir(self, content_hash):
+        return os.path.join(self.cache_root, content_hash)
+
+    def song_output_dir(self, song_id):
+        return os.path.join(self.outputs_root, str(song_id))
+
+    def release(self, song):
+        """Drop a song's reference and delete artifacts nobody uses any more.
+
+        Must be called before the song row itself is deleted.
+        """
+        content_hash = song.cache_ref
+        if content_hash:
+            db.session.execute(
+                update(CachedResult)
+                .where(CachedResult.content_hash == content_hash, CachedResult.ref_count > 0)
+                .values(ref_count=CachedResult.ref_count - 1)
+            )
+            # acquire() never revives an entry at 0, so it is safe to drop
+            result = db.session.execute(
+                delete(CachedResult)
+                .where(CachedResult.content_hash == content_hash, CachedResult.ref_count <= 0)
+            )
+            song.cache_ref = None
+            db.session.commit()
+            if result.rowcount == 1:
+                self._delete_dir(self.entry_dir(content_hash))
+        self._delete_dir(self.song_output_dir(song.id))
+
+    def _move_into(self, directory, song):
+        """Move the song's artifact files into `directory`; returns {column: new path}."""
+        os.makedirs(directory, exist_ok=True)
+        moved = {}
+        for column in ARTIFACT_COLUMNS:
+            path = getattr(song, column)
+            if not path or not os.path.exists(path):
+                continue
+            target = os.path.join(directory, os.path.basename(path))
+            if os.path.abspath(path) != target:
+                # Same filesystem (both under outputs/), so this is a rename;
+                # players that already opened the file keep reading it.
+                os.replace(path, target)
+            moved[column] = target
+        return moved
+
+    def _delete_dir(self, path):
+        if not path:
+            return
+        path = os.path.abspath(path)
+        # Never delete anything but a song or cache entry directory under
+        # shared_data/outputs, and never the roots themselves.
+        if os.path.dirname(path) not in (self.outputs_root, self.cache_root) or path == self.cache_root:
+            print(f"Refusing to delete {path}: not a song output or cache directory")
+            return
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,94 @@
+import time
+
+from job_queue import JobQueue
+from models import db, Job, Song
+from output_manager import OutputManager
+
+
+def expire_lease(job_id):
+    db.session.execute(db.update(Job).where(Job.id == job_id).values(lease_expires_at=time.time() - 1))
+    db.session.commit()
+
+def test_only_one_worker_claims_a_job(app):
+    queue = JobQueue(lease_seconds=60)
+    job = queue.enqueue(1, 'separation')
+    claimed = queue.claim('separation', 'a')
+    assert claimed.id == job.id and claimed.lease_owner == 'a' and claimed.attempts == 1
+    assert queue.claim('separation', 'b') is None
+    assert queue.claim('transcription', 'b') is None
+
+def test_jobs_with_dependencies_start_blocked(app):
+    queue = JobQueue(max_attempts=4)
+    conversion, transcription = queue.enqueue_graph(1, {'conversion': [], 'transcription': ['conversion']}, {'k': 'v'})
+    assert (conversion.status, transcription.status) == ('pending', 'blocked')
+    assert transcription.depends_on == ['conversion'] and transcription.payload == {'k': 'v'}
+    assert transcription.max_attempts == 4
+    assert queue.claim('transcription', 'a') is None
+    assert queue.claim('conversion', 'a').id == conversion.id
+
+def test_heartbeat_only_extends_own_lease(app):
+    queue = JobQueue(lease_seconds=60)
+    job_id = queue.enqueue(1, 'separation').id
+    queue.claim('separation', 'a')
+    expire_lease(job_id)
+    assert queue.heartbeat(job_id, 'b') is False
+    assert queue.heartbeat(job_id, 'a') is True
+    # Extended, so nobody else can take it
+    assert queue.claim('separation', 'b') is None
+
+def test_expired_lease_is_reclaimed(app):
+    queue = JobQueue(lease_seconds=60)
+    job_id = queue.enqueue(1, 'separation').id
+    queue.claim('separation', 'a')
+    expire_lease(job_id)
+    reclaimed = queue.claim('separation', 'b')
+    assert reclaimed.id == job_id and reclaimed.lease_owner == 'b' and reclaimed.attempts == 2
+    # The first worker lost its lease and can no longer finish or fail the job
+    assert queue.complete(job_id, 'a') is False
+    assert queue.fail(job_id, 'a', 'late') is None
+    assert queue.complete(job_id, 'b') is True
+
+def test_failed_job_retries_after_backoff_then_gives_up(app):
+    queue = JobQueue(lease_seconds=60, max_attempts=2, retry_backoff=30)
+    job_id = queue.enqueue(1, 'transcription').id
+    queue.claim('transcription', 'a')
+    assert queue.fail(job_id, 'a', 'boom') is True
+    job = db.session.get(Job, job_id)
+    assert job.status == 'pending' and job.available_at > time.time() + 20
+    # Backing off
+    assert queue.claim('transcription', 'a') is None
+
+    db.session.execute(db.update(Job).where(Job.id == job_id).values(available_at=time.time() - 1))
+    db.session.commit()
+    assert queue.claim('transcription', 'a').attempts == 2
+    assert queue.fail(job_id, 'a', 'boom again') is False
+    job = db.session.get(Job, job_id)
+    assert job.status == 'failed' and job.last_error == 'boom again'
+    assert queue.claim('transcription', 'a') is None
+
+def test_expired_lease_on_last_attempt_gives_up(app):
+    queue = JobQueue(lease_seconds=60, max_attempts=2)
+    job_id = queue.enqueue(1, 'separation').id
+    for worker_id in ('a', 'b'):
+        # The worker dies holding the lease every time
+        assert queue.claim('separation', worker_id).id == job_id
+        expire_lease(job_id)
+    assert queue.claim('separation', 'c') is None
+    given_up = queue.expire('separation')
+    assert [job.id for job in given_up] == [job_id]
+    assert given_up[0].status == 'failed' and given_up[0].lease_owner is None
+    assert queue.expire('separation') == []
+
+def test_removing_a_song_deletes_all_its_jobs(app):
+    queue = JobQueue()
+    output_manager = OutputManager()
+    song_id = output_manager.add_song_data('Title', 'Artist', '').id
+    done_id = queue.enqueue(song_id, 'conversion').id
+    queue.claim('conversion', 'a')
+    queue.complete(done_id, 'a')
+    queue.enqueue(song_id, 'separation')
+    other = queue.enqueue(song_id + 1, 'separation')
+
+    output_manager.remove_song_data(song_id)
+    assert db.session.get(Song, song_id) is None
+    assert [job.id for job in Job.query.all()] == [other.id]
@@ -0,0 +1,48 @@
+import pytest
+
+from models import db, Song
+from output_manager import OutputManager, decode_cursor, encode_cursor
+
+TITLES = [None, 'b', 'a', None, 'b', 'c', 'a', None, 'b', 'a', 'c', None, 'b']
+
+
+@pytest.fixture
+def songs(app):
+    for title in TITLES:
+        db.session.add(Song(title=title, artist='Artist', status='done'))
+    db.session.commit()
+
+def all_pages(output_manager, limit, **kwargs):
+    ids = []
+    cursor = None
+    while True:
+        rows, cursor = output_manager.list_songs(limit=limit, cursor=cursor, **kwargs)
+        ids.extend(row.id for row in rows)
+        if cursor is None:
+            return ids
+
+def expected_order(sort, descending):
+    """(sort value, id) order as SQLite sorts it: NULLs first ascending, last descending."""
+    songs = Song.query.all()
+    def key(song):
+        value = getattr(song, sort)
+        return (value is not None, value or '', song.id)
+    return [song.id for song in sorted(songs, key=key, reverse=descending)]
+
+def test_pages_cover_every_row_once(songs):
+    output_manager = OutputManager()
+    for sort in ('id', 'title'):
+        for order in ('asc', 'desc'):
+            expected = expected_order(sort, order == 'desc')
+            for limit in (1, 2, 3, 5, len(TITLES), len(TITLES) + 1):
+                ids = all_pages(output_manager, limit, sort=sort, order=order)
+                assert ids == expected, (sort, order, limit, ids)
+
+def test_cursor_round_trips():
+    for value, song_id in ((None, 4), ('b', 2), ('Ünïcode', 7), (12, 12)):
+        assert decode_cursor(encode_cursor(value, song_id)) == (value, song_id)
+
+def test_invalid_cursor_is_rejected(songs):
+    for cursor in ('not-base64!', encode_cursor('a', None), 'W10='):
+        with pytest.raises(ValueError):
+            OutputManager().list_songs(cursor=cursor, sort='title')
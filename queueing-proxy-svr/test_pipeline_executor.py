@@ -0,0 +1,119 @@
+import queue
+
+import pytest
+
+from events import EventBroker
+from job_queue import JobQueue, StageError
+from models import db, Song
+from output_manager import OutputManager
+from pipeline import PipelineExecutor
+
+
+class Pipeline:
+    """A PipelineExecutor whose stages are run one job at a time by the test."""
+
+    def __init__(self, app, max_attempts=3):
+        self.queue = JobQueue(lease_seconds=60, max_attempts=max_attempts, retry_backoff=0)
+        self.events = EventBroker()
+        self.done = []
+        self.ran = []
+        self.failures = {}
+        self.executor = PipelineExecutor(app, self.queue, OutputManager(event_broker=self.events), on_song_done=self.done.append)
+        for stage, status in (('conversion', 'converting'), ('separation', 'separating'), ('transcription', 'transcribing')):
+            self.executor.add_stage(stage, self._handler(stage), status)
+
+    def _handler(self, stage):
+        def run(job):
+            # The song shows the running stage while its handler runs
+            self.ran.append((stage, db.session.get(Song, job.song_id).status))
+            if stage in self.failures:
+                raise self.failures[stage]
+        return run
+
+    def run_next(self, stage):
+        """Claim and run one job of `stage` like a worker would; False if none is claimable."""
+        job = self.queue.claim(stage, 'worker')
+        if job is None:
+            return False
+        self.executor.pools[stage]._process(job, 'worker')
+        return True
+
+    def statuses(self, song_id):
+        return self.executor.stage_status(song_id)
+
+
+@pytest.fixture
+def song_id(app):
+    return OutputManager().add_song_data('Title', 'Artist', 'song.wav').id
+
+def drain(events):
+    payloads = []
+    while True:
+        try:
+            payloads.append(events.get_nowait())
+        except queue.Empty:
+            return payloads
+
+def test_dependents_wait_for_all_their_dependencies(app, song_id):
+    pipeline = Pipeline(app)
+    pipeline.executor.submit(song_id, {}, {'conversion': [], 'separation': ['conversion'], 'transcription': ['conversion', 'separation']})
+    assert pipeline.statuses(song_id) == {'conversion': 'pending', 'separation': 'blocked', 'transcription': 'blocked'}
+    assert not pipeline.run_next('separation')
+
+    assert pipeline.run_next('conversion')
+    assert pipeline.statuses(song_id) == {'conversion': 'done', 'separation': 'pending', 'transcription': 'blocked'}
+    assert not pipeline.run_next('transcription')
+
+    assert pipeline.run_next('separation')
+    assert pipeline.statuses(song_id)['transcription'] == 'pending'
+    assert pipeline.run_next('transcription')
+    assert pipeline.ran == [('conversion', 'converting'), ('separation', 'separating'), ('transcription', 'transcribing')]
+
+def test_dependencies_on_skipped_stages_are_ignored(app, song_id):
+    pipeline = Pipeline(app)
+    pipeline.executor.submit(song_id, {}, {'separation': ['conversion'], 'transcription': []})
+    assert pipeline.statuses(song_id) == {'separation': 'pending', 'transcription': 'pending'}
+
+def test_song_is_done_once_every_stage_is(app, song_id):
+    pipeline = Pipeline(app)
+    events = pipeline.events.subscribe(song_id)
+    pipeline.executor.submit(song_id, {}, {'separation': [], 'transcription': []})
+
+    assert pipeline.run_next('separation')
+    assert db.session.get(Song, song_id).status == 'queued'
+    assert drain(events)[-1] == {'song_id': song_id, 'status': 'queued', 'progress': 0.5}
+    assert pipeline.done == []
+
+    assert pipeline.run_next('transcription')
+    assert db.session.get(Song, song_id).status == 'done'
+    assert drain(events)[-1] == {'song_id': song_id, 'status': 'done', 'progress': 1.0}
+    assert pipeline.done == [song_id]
+    # Finishing is only ever reported once
+    pipeline.executor._refresh_song_status(song_id)
+    assert pipeline.done == [song_id]
+
+def test_giving_up_cancels_stages_not_started_and_fails_the_song(app, song_id):
+    pipeline = Pipeline(app, max_attempts=1)
+    pipeline.failures['separation'] = StageError('error_separation', 'demucs crashed')
+    pipeline.executor.submit(song_id, {}, {'conversion': [], 'separation': ['conversion'], 'transcription': ['conversion', 'separation']})
+    pipeline.run_next('conversion')
+
+    assert pipeline.run_next('separation')
+    assert pipeline.statuses(song_id) == {'conversion': 'done', 'separation': 'failed', 'transcription': 'cancelled'}
+    assert db.session.get(Song, song_id).status == 'error_separation'
+    assert not pipeline.run_next('transcription')
+    assert pipeline.done == []
+
+def test_failure_is_retried_before_giving_up(app, song_id):
+    pipeline = Pipeline(app, max_attempts=2)
+    pipeline.failures['transcription'] = RuntimeError('connection refused')
+    pipeline.executor.submit(song_id, {}, {'separation': [], 'transcription': []})
+
+    assert pipeline.run_next('transcription')
+    assert pipeline.statuses(song_id) == {'separation': 'pending', 'transcription': 'pending'}
+    assert not db.session.get(Song, song_id).status.startswith('error')
+
+    assert pipeline.run_next('transcription')
+    # Not a StageError, so the status is derived from the stage
+    assert db.session.get(Song, song_id).status == 'error_transcription'
+    assert pipeline.statuses(song_id)['separation'] == 'cancelled'
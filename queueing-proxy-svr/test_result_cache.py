@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from models import db, CachedResult, Song
+from output_manager import OutputManager
+from result_cache import ResultCache
+
+HASH = 'ab' * 32
+
+
+@pytest.fixture
+def cache(app, tmp_path):
+    return ResultCache(str(tmp_path / 'outputs'))
+
+@pytest.fixture
+def output_manager(cache):
+    return OutputManager(result_cache=cache)
+
+def processed_song(output_manager, cache, content_hash=HASH):
+    """A song whose pipeline just finished, with its files in its own directory."""
+    song = output_manager.add_song_data('Title', 'Artist', '')
+    song_dir = cache.song_output_dir(song.id)
+    os.makedirs(song_dir)
+    for column, name in (('original_file_path', 'song.flac'), ('vocals_file_path', 'vocals.flac'), ('instrumental_file_path', 'instrumental.flac')):
+        path = os.path.join(song_dir, name)
+        with open(path, 'w') as f:
+            f.write(f"{song.id} {name}")
+        setattr(song, column, path)
+    song.content_hash = content_hash
+    song.lyrics_text = 'la la la'
+    song.status = 'done'
+    db.session.commit()
+    return song
+
+def uploaded_song(output_manager, cache):
+    song = output_manager.add_song_data('Title', 'Artist', '')
+    os.makedirs(cache.song_output_dir(song.id))
+    return song
+
+def test_store_moves_the_artifacts_into_the_cache(output_manager, cache):
+    song = processed_song(output_manager, cache)
+    song_dir = cache.song_output_dir(song.id)
+    entry = cache.store(song)
+
+    assert entry.ref_count == 1 and song.cache_ref == HASH
+    entry_dir = cache.entry_dir(HASH)
+    assert song.instrumental_file_path == entry.instrumental_file_path == os.path.join(entry_dir, 'instrumental.flac')
+    assert sorted(os.listdir(entry_dir)) == ['instrumental.flac', 'song.flac', 'vocals.flac']
+    assert os.listdir(song_dir) == []
+    assert entry.lyrics_text == 'la la la'
+
+def test_cache_hit_shares_the_entry_until_the_last_song_is_removed(output_manager, cache):
+    first = processed_song(output_manager, cache)
+    cache.store(first)
+    second = uploaded_song(output_manager, cache)
+
+    assert output_manager.reuse_cached_result(second.id, HASH) is not None
+    second = db.session.get(Song, second.id)
+    assert second.status == 'done' and second.cache_ref == HASH
+    assert second.vocals_file_path == first.vocals_file_path and second.lyrics_text == 'la la la'
+    assert db.session.get(CachedResult, HASH).ref_count == 2
+
+    output_manager.remove_song_data(first.id)
+    assert db.session.get(CachedResult, HASH).ref_count == 1
+    assert not os.path.exists(cache.song_output_dir(first.id))
+    assert os.path.exists(second.vocals_file_path)
+
+    output_manager.remove_song_data(second.id)
+    assert db.session.get(CachedResult, HASH) is None
+    assert not os.path.exists(cache.entry_dir(HASH))
+
+def test_miss_leaves_the_song_alone(output_manager, cache):
+    song = uploaded_song(output_manager, cache)
+    assert cache.acquire(None) is None
+    assert output_manager.reuse_cached_result(song.id, HASH) is None
+    assert db.session.get(Song, song.id).status == 'queued'
+
+def test_only_the_first_of_two_identical_uploads_fills_the_cache(output_manager, cache):
+    first = processed_song(output_manager, cache)
+    second = processed_song(output_manager, cache)
+    cache.store(first)
+
+    assert cache.store(second) is None
+    assert second.cache_ref is None
+    assert os.path.dirname(second.vocals_file_path) == cache.song_output_dir(second.id)
+
+    # Removing the song with its own copy doesn't touch the shared entry
+    output_manager.remove_song_data(second.id)
+    assert db.session.get(CachedResult, HASH).ref_count == 1
+    assert os.path.exists(first.vocals_file_path)
+
+def test_a_reused_song_id_cannot_reach_the_cached_files(output_manager, cache):
+    first = processed_song(output_manager, cache)
+    cache.store(first)
+    second = uploaded_song(output_manager, cache)
+    output_manager.reuse_cached_result(second.id, HASH)
+    output_manager.remove_song_data(second.id)
+
+    # SQLite hands the freed id out again
+    third = uploaded_song(output_manager, cache)
+    assert third.id == second.id
+    output_manager.remove_song_data(third.id)
+    assert db.session.get(CachedResult, HASH).ref_count == 1
+    assert os.path.exists(first.vocals_file_path)
+
+def test_acquire_skips_an_entry_still_being_stored(output_manager, cache):
+    db.session.add(CachedResult(content_hash=HASH, ref_count=0))
+    db.session.commit()
+    assert cache.acquire(HASH) is None
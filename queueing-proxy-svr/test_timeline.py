@@ -0,0 +1,52 @@
+import pytest
+
+from timeline import Timeline, pack_timeline
+
+# Times that float32 stores exactly, so the round trip can be compared as is
+WORDS = [
+    {'start': 0.5, 'end': 1.0, 'text': 'one'},
+    {'start': 1.0, 'end': 1.5, 'text': 'two'},
+    {'start': 2.0, 'end': 3.0, 'text': 'three'},
+    {'start': 4.0, 'end': 4.5, 'text': 'four'},
+]
+
+
+@pytest.fixture
+def timeline():
+    return Timeline(pack_timeline(WORDS))
+
+def test_pack_round_trip():
+    words = [
+        {'start': 2.25, 'end': 2.75, 'text': ' coração '},
+        {'start': 0.125, 'end': 1.0, 'text': 'meu'},
+    ]
+    timeline = Timeline(pack_timeline(words))
+    assert len(timeline) == 2
+    # Sorted by start, surrounding whitespace dropped, UTF-8 text intact
+    assert [timeline.word(i) for i in range(2)] == [
+        {'start': 0.125, 'end': 1.0, 'text': 'meu'},
+        {'start': 2.25, 'end': 2.75, 'text': 'coração'},
+    ]
+
+def test_empty_timeline():
+    timeline = Timeline(pack_timeline([]))
+    assert len(timeline) == 0
+    assert timeline.window(0, 10) == (0, 0)
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError):
+        Timeline(b'JSON' + bytes(4))
+
+@pytest.mark.parametrize('t, span, expected', [
+    (0.0, 0.5, (0, 0)),     # the first word starts exactly at t + span
+    (0.0, 0.75, (0, 1)),
+    (0.5, 0.5, (0, 1)),     # a word starting exactly at t is included
+    (1.0, 0.5, (1, 2)),     # 'one' ended exactly at t
+    (0.75, 1.5, (0, 3)),    # 'one' is still being sung at t
+    (1.75, 1.0, (2, 3)),    # t falls in the gap after 'two'
+    (2.5, 0.25, (2, 3)),    # t falls in the middle of 'three'
+    (3.0, 1.0, (3, 3)),     # 'three' ended at t, 'four' starts at t + span
+    (5.0, 1.0, (4, 4)),     # after the last word
+])
+def test_window_boundaries(timeline, t, span, expected):
+    assert timeline.window(t, span) == expected
@@ -0,0 +1,86 @@
+import array
+import bisect
+import struct
+import sys
+
+# Packed, columnar form of lyrics_json (a list of {start, end, text} words):
+#
+#   b"LTL1" | uint32 count | float32 starts[count] | float32 ends[count]
+#   | uint32 offsets[count + 1] | UTF-8 text of every word, concatenated
+#
+# all little-endian. Word i's text is text[offsets[i]:offsets[i + 1]]. About
+# 12 bytes per word plus the text itself, and it can be searched by start
+# time with a binary search without decoding the rest.
+MAGIC = b"LTL1"
+HEADER = struct.Struct("<4sI")
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def pack_timeline(words):
+    words = sorted(words, key=lambda word: word["start"])
+    starts = array.array("f")
+    ends = array.array("f")
+    offsets = array.array("I", [0])
+    texts = []
+    position = 0
+    for word in words:
+        encoded = word["text"].strip().encode("utf-8")
+        starts.append(word["start"])
+        ends.append(word["end"])
+        texts.append(encoded)
+        position += len(encoded)
+        offsets.append(position)
+    return b"".join([
+        HEADER.pack(MAGIC, len(words)),
+        _little_endian(starts).tobytes(),
+        _little_endian(ends).tobytes(),
+        _little_endian(offsets).tobytes(),
+    ] + texts)
+
+
+class Timeline:
+    def __init__(self, blob):
+        magic, count = HEADER.unpack_from(blob)
+        if magic != MAGIC:
+            raise ValueError("Not a lyrics timeline")
+        position = HEADER.size
+        self.starts = self._read(blob, "f", position, count)
+        position += 4 * count
+        self.ends = self._read(blob, "f", position, count)
+        position += 4 * count
+        self.offsets = self._read(blob, "I", position, count + 1)
+        position += 4 * (count + 1)
+        self.text = memoryview(blob)[position:]
+
+    @staticmethod
+    def _read(blob, typecode, position, count):
+        values = array.array(typecode)
+        values.frombytes(blob[position:position + values.itemsize * count])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def __len__(self):
+        return len(self.starts)
+
+    def word(self, i):
+        return {
+            "start": round(self.starts[i], 3),
+            "end": round(self.ends[i], 3),
+            "text": bytes(self.text[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8"),
+        }
+
+    def window(self, t, span):
+        """Index range [first, last) of the words sung between t and t + span."""
+        # The word that started last at or before t, unless it has already ended
+        first = max(bisect.bisect_right(self.starts, t) - 1, 0)
+        if first < len(self) and self.ends[first] <= t:
+            first += 1
+        last = bisect.bisect_left(self.starts, t + span, lo=first)
+        return first, last
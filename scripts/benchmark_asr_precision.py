@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Compare ASR inference precisions on reference clips: speed, memory and accuracy.
+
+No reference clips ship with the repo; --clips must point at a directory of
+your own. Every clip in it needs a reference transcript next to it with the
+same name and a .txt extension (e.g. verse.wav + verse.txt). A few 20-30 s
+sung excerpts with hand-checked lyrics are enough. Each precision runs in its
+own process so peak RSS is measured cleanly.
+
+    python scripts/benchmark_asr_precision.py --clips ~/reference_clips --modes fp32,bf16,int8
+
+WER is measured against each clip's .txt reference transcript. dWER is the
+difference from the first mode listed (normally fp32), so it shows the
+accuracy cost of a lower precision.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg", ".m4a")
+
+
+def find_clips(clips_dir):
+    clips = []
+    for name in sorted(os.listdir(clips_dir)):
+        base, ext = os.path.splitext(name)
+        reference = os.path.join(clips_dir, base + ".txt")
+        if ext.lower() in AUDIO_EXTENSIONS and os.path.exists(reference):
+            clips.append((os.path.join(clips_dir, name), reference))
+    return clips
+
+
+def normalize_words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + deletions + insertions)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        # ru_maxrss is KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def run_mode(precision, clips_dir):
+    """Load the model at `precision`, transcribe every clip and return the measurements."""
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "transcription_svr"))
+    import soundfile
+    import transcribe
+
+    started = time.perf_counter()
+    model = transcribe.load_model(precision=precision)
+    load_seconds = time.perf_counter() - started
+
+    audio_seconds = 0.0
+    infer_seconds = 0.0
+    errors = 0
+    reference_words = 0
+    for clip, reference_path in find_clips(clips_dir):
+        audio_seconds += soundfile.info(clip).duration
+        started = time.perf_counter()
+        results = model.transcribe(clip, return_time_stamps=True)
+        infer_seconds += time.perf_counter() - started
+
+        with open(reference_path, encoding="utf-8") as f:
+            reference = normalize_words(f.read())
+        hypothesis = normalize_words(" ".join(r.text for r in results if r.text))
+        errors += word_errors(reference, hypothesis)
+        reference_words += len(reference)
+
+    return {
+        "precision": transcribe.MODEL_CONFIG["precision"],
+        "device": transcribe.MODEL_CONFIG["device"],
+        "load_seconds": load_seconds,
+        "audio_seconds": audio_seconds,
+        "infer_seconds": infer_seconds,
+        "rtf": infer_seconds / audio_seconds if audio_seconds else None,
+        "wer": errors / reference_words if reference_words else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ASR inference precisions (RTF, RSS, WER).")
+    parser.add_argument("--clips", required=True,
+                        help="Directory of audio clips with matching .txt reference transcripts (not included in the repo)")
+    parser.add_argument("--modes", default="fp32,bf16,int8", help="Comma-separated precisions to compare")
+    parser.add_argument("--worker", help=argparse.SUPPRESS) # run a single mode and print JSON
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_mode(args.worker, args.clips)))
+        return
+
+    if not find_clips(args.clips):
+        sys.exit(f"No clips with .txt references found in {args.clips}")
+
+    rows = []
+    for mode in args.modes.split(","):
+        print(f"Running {mode}...")
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--clips", args.clips, "--worker", mode],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            print(f"{mode} failed:\n{result.stderr[-2000:]}")
+            continue
+        rows.append((mode, json.loads(result.stdout.strip().splitlines()[-1])))
+
+    baseline_wer = rows[0][1]["wer"] if rows else None
+    print(f"\n{'mode':<6} {'ran as':<12} {'load s':>7} {'RTF':>6} {'WER':>7} {'dWER':>7} {'peak RSS MB':>12}")
+    for mode, r in rows:
+        delta = r["wer"] - baseline_wer if r["wer"] is not None and baseline_wer is not None else None
+        print(
+            f"{mode:<6} {r['precision'] + '/' + r['device']:<12} {r['load_seconds']:>7.1f} "
+            f"{r['rtf'] or 0:>6.3f} {(r['wer'] or 0) * 100:>6.2f}% "
+            f"{(delta or 0) * 100:>+6.2f}% {r['peak_rss_mb']:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
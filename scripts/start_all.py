@@ -44,6 +44,45 @@ def _stop_process(process, name):
     except (ProcessLookupError, OSError):
         print(f"{name} process already stopped.")
 
+# How long to wait for a server to answer before giving up on it
+STARTUP_TIMEOUT = float(os.getenv("STARTUP_TIMEOUT", 60))
+# The ML services bind quickly but load their models in the background
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", 900))
+
+def wait_for_url(url, name, process=None, timeout=STARTUP_TIMEOUT, expect_ok=False):
+    """Poll url until it answers (with a 2xx if expect_ok). Returns seconds waited, or None."""
+    started = time.time()
+    while time.time() - started < timeout:
+        if process is not None and process.poll() is not None:
+            print(f"{name} exited with code {process.returncode} during startup.")
+            return None
+        try:
+            response = requests.get(url, timeout=2)
+            if not expect_ok or response.ok:
+                return time.time() - started
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    print(f"{name} did not answer {url} within {timeout:.0f}s.")
+    return None
+
+def wait_until_ready(base_url, name, process=None):
+    """Wait for /health (port bound) and then /ready (models loaded), reporting both."""
+    base_url = base_url.rstrip("/")
+    bound = wait_for_url(f"{base_url}/health", name, process)
+    if bound is None:
+        return False
+    print(f"{name} is up after {bound:.1f}s; waiting for models to load...")
+    ready = wait_for_url(f"{base_url}/ready", name, process, timeout=READY_TIMEOUT, expect_ok=True)
+    if ready is None:
+        return False
+    try:
+        timeline = requests.get(f"{base_url}/health", timeout=2).json().get("timeline", {})
+        print(f"{name} ready; startup timeline: " + ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in timeline.items()))
+    except (requests.exceptions.RequestException, ValueError):
+        print(f"{name} ready.")
+    return True
+
 def start_queueing_proxy_server():
     """Starts the Flask server in a subprocess."""
     print("Starting Queueing Proxy server...")
@@ -52,7 +91,7 @@ def start_queueing_proxy_server():
         cwd="queueing-proxy-svr",
         **_popen_kwargs()
     )
-    time.sleep(3) # Give server time to start
+    wait_for_url(PROXY_SERVER_URL, "Queueing Proxy server", process)
     return process
 
 def start_music_separation_server():
@@ -63,7 +102,7 @@ def start_music_separation_server():
         cwd="music-separation-svr",
         **_popen_kwargs()
     )
-    time.sleep(3) # Give server time to start
+    wait_for_url(f"{MUSIC_SEPARATION_SERVER_URL.rstrip('/')}/health", "Music separation server", process)
     return process
 
 def start_transcription_server():
@@ -74,7 +113,7 @@ def start_transcription_server():
         cwd="transcription_svr",
         **_popen_kwargs()
     )
-    time.sleep(3) # Give server time to start
+    wait_for_url(f"{TRANSCRIPTION_SERVER_URL.rstrip('/')}/health", "Transcription server", process)
     return process
 
 def start_gui():
@@ -88,7 +127,7 @@ def start_gui():
         cwd="gui",
         **kwargs
     )
-    time.sleep(3) # Give server time to start
+    wait_for_url(GUI_URL, "GUI", process)
     return process
 
 def main():
@@ -118,6 +157,11 @@ def main():
     except requests.exceptions.ConnectionError:
         gui_process = start_gui()
 
+    # Both ML services load their models concurrently; wait for them here
+    # rather than one after the other during startup.
+    wait_until_ready(MUSIC_SEPARATION_SERVER_URL, "Music separation server", music_separation_server_process)
+    wait_until_ready(TRANSCRIPTION_SERVER_URL, "Transcription server", transcription_server_process)
+
     input("Press Enter to stop all servers...")
     _stop_process(queueing_proxy_server_process, "Queueing Proxy server")
     _stop_process(music_separation_server_process, "Music separation server")
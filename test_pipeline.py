@@ -1,5 +1,5 @@
 import requests
-import time
+import json
 import os
 import sys
 
@@ -42,37 +42,51 @@ def test_pipeline():
     song_id = result['song_id']
     print(f"Successfully queued song! ID: {song_id}")
 
-    # 2. Poll for completion
-    status_url = f"http://localhost:5001/get_song_data?song_id={song_id}"
+    # 2. Wait for completion via the proxy's event stream
+    events_url = f"http://localhost:5001/events?song_id={song_id}"
     
     print("Waiting for processing to complete...")
-    max_retries = 120 # 2 minutes timeout (it takes a while for separation and transcription)
-    for i in range(max_retries):
-        resp = requests.get(status_url)
-        if resp.status_code == 200:
-            data = resp.json()
-            status = data['status']
-            print(f"[{i}/{max_retries}] Status: {status}")
-            
-            if status == 'done':
-                print("Processing completed successfully!")
-                
-                # Check artifacts
-                output_dir = os.path.join("shared_data", "outputs", str(song_id))
-                print(f"\nChecking artifacts in {output_dir}:")
-                if os.path.exists(output_dir):
-                    print("Directory exists.")
-                    for f in os.listdir(output_dir):
-                        print(f"  - {f}")
-                else:
-                    print("ERROR: Output directory does not exist!")
-                
-                return
-            elif status.startswith('error'):
-                print(f"Processing failed with status: {status}")
-                return
-            
-        time.sleep(5)
+    try:
+        # The proxy sends a keep-alive every 15s, so a 60s read timeout means it went away
+        with requests.get(events_url, stream=True, timeout=(5, 60)) as resp:
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                event = json.loads(line[len('data:'):])
+                status = event['status']
+                print(f"Status: {status} (progress {event.get('progress')})")
+
+                if status == 'done':
+                    print("Processing completed successfully!")
+                    
+                    # Check the artifacts recorded on the song. Finished stems
+                    # live in the shared result cache (outputs/cache/<hash>),
+                    # not in the song's own directory, so ask the proxy for them.
+                    print("\nChecking artifacts:")
+                    for audio_type in ('original', 'vocals', 'instrumental'):
+                        stem = requests.get(
+                            "http://localhost:5001/stream_audio",
+                            params={'song_id': song_id, 'type': audio_type, 'format': 'source'},
+                            stream=True,
+                        )
+                        size = int(stem.headers.get('Content-Length', 0))
+                        stem.close()
+                        if stem.status_code == 200 and size > 0:
+                            print(f"  - {audio_type}: {size} bytes")
+                        else:
+                            print(f"ERROR: {audio_type} is missing ({stem.status_code})")
+
+                    song = requests.get("http://localhost:5001/get_song_data", params={'song_id': song_id}).json()
+                    if song.get('lyrics_json'):
+                        print(f"  - lyrics: {len(song['lyrics_json'])} words")
+                    else:
+                        print("ERROR: No lyrics recorded for the song!")
+                    return
+                elif status.startswith('error'):
+                    print(f"Processing failed with status: {status}")
+                    return
+    except requests.exceptions.ReadTimeout:
+        pass
         
     print("Timeout waiting for processing to complete.")
 
@@ -1,11 +1,22 @@
+import os
+import sys
+# startup.py is shared by the services and lives in the repo's common/ directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from startup import Startup
+
+startup = Startup("transcription")
+
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from marshmallow import Schema, fields, ValidationError
 from pathlib import Path
 import traceback
-from transcribe import transcribe_to_structured_data
+from transcribe import AudioTooLong, align_scheduler, align_to_structured_data, load_model, result_cache, scheduler, start_process_pool, transcribe_to_structured_data
+from scheduler import SchedulerFull
 import argparse
 
+startup.mark("imports")
+
 app = Flask(__name__)
 CORS(app)
 
@@ -24,51 +35,112 @@ CORS(app)
 import requests
 import os
 
+# Uploads and outputs live under the shared data directory that the proxy
+# also writes to, so co-located callers can pass paths instead of bytes.
+SHARED_DATA_ROOT = Path(os.environ.get(
+    'SHARED_DATA_ROOT',
+    Path(__file__).resolve().parent.parent / 'shared_data'
+)).resolve()
+
+# How long /transcribe waits for the model to finish loading before giving up
+READY_TIMEOUT = int(os.environ.get('TRANSCRIPTION_READY_TIMEOUT', 900))
+
+@app.route('/health')
+def health():
+    """Liveness: the process is up and serving, whether or not the model is loaded."""
+    return jsonify({'status': 'ok', **startup.report()}), 200
+
+@app.route('/ready')
+def ready():
+    report = startup.report()
+    return jsonify(report), 200 if report['ready'] else 503
+
+@app.route('/stats')
+def stats():
+    """Inference queue depth, batching and latency percentiles, and result cache hits."""
+    return jsonify({
+        'transcription': scheduler.stats(),
+        'alignment': align_scheduler.stats(),
+        'cache': result_cache.stats(),
+    }), 200
+
+def resolve_shared_path(path_str):
+    """Resolve a caller-supplied path, or return None if it escapes SHARED_DATA_ROOT."""
+    path = Path(path_str).resolve()
+    if not path.is_relative_to(SHARED_DATA_ROOT):
+        return None
+    return path
+
 @app.route('/transcribe', methods=['POST'])
 def transcribe_audio_endpoint():
-    # try:
-    #     # Validate request form data against schema
-    #     result = schema.load(request.form)
-    # except ValidationError as err:
-    #     return jsonify(err.messages), 400
-    # if not data or 'input_path' not in data:
-    #     return jsonify({'error': 'Missing input_path'}), 400
-    
-    # Validate file presence
-    if 'music_file' not in request.files:
-        return jsonify({'music_file': ['Missing data for required field.']}), 400
-    
-    file = request.files['music_file']
-    if file.filename == '':
-        return jsonify({'music_file': ['No selected file.']}), 400
-
-    # Validate file presence
-    if 'music_file' not in request.files:
-        return jsonify({'music_file': ['Missing data for required field.']}), 400
-    
-    file = request.files['music_file']
-    if file.filename == '':
-        return jsonify({'music_file': ['No selected file.']}), 400
-    
-    # Output directory shared_data/outputs/<song_id>
-    output_dir_str = request.form.get('output_dir')
-    if not output_dir_str:
-        return jsonify({'error': 'Missing output_dir in form data'}), 400
-        
-    output_dir = Path(output_dir_str)
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    if file: #and allowed_file(file.filename):
-        filename = file.filename # secure_filename(file.filename)
-        input_path = os.path.join(output_dir, filename)
-        file.save(input_path)
+    if not startup.wait_ready(READY_TIMEOUT):
+        return jsonify({'error': 'Transcription model not initialized', **startup.report()}), 503
+
+    # Preferred: JSON {input_path, output_dir} referencing a file the proxy
+    # already wrote to shared_data. Multipart upload remains for remote nodes
+    # that don't share the filesystem.
+    if request.is_json:
+        data = request.get_json()
+        if not data or 'input_path' not in data:
+            return jsonify({'error': 'Missing input_path'}), 400
+        if 'output_dir' not in data:
+            return jsonify({'error': 'Missing output_dir'}), 400
+
+        input_path = resolve_shared_path(data['input_path'])
+        output_dir = resolve_shared_path(data['output_dir'])
+        if input_path is None or output_dir is None:
+            return jsonify({'error': f'Paths must be inside {SHARED_DATA_ROOT}'}), 400
+        if not input_path.is_file():
+            return jsonify({'error': f'Input file not found: {input_path}'}), 404
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        filename = input_path.name
+        input_path = str(input_path)
+        vad = bool(data.get('vad'))
+        lyrics = data.get('lyrics')
+        language = data.get('language')
     else:
-        return jsonify({'music_file': ['Invalid file type.']}), 400
-    
+        # Validate file presence
+        if 'music_file' not in request.files:
+            return jsonify({'music_file': ['Missing data for required field.']}), 400
+
+        file = request.files['music_file']
+        if file.filename == '':
+            return jsonify({'music_file': ['No selected file.']}), 400
+
+        # Output directory shared_data/outputs/<song_id>
+        output_dir_str = request.form.get('output_dir')
+        if not output_dir_str:
+            return jsonify({'error': 'Missing output_dir in form data'}), 400
+
+        output_dir = Path(output_dir_str)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        vad = request.form.get('vad') in ('1', 'true')
+        lyrics = request.form.get('lyrics')
+        language = request.form.get('language')
+
+        if file: #and allowed_file(file.filename):
+            filename = file.filename # secure_filename(file.filename)
+            input_path = os.path.join(output_dir, filename)
+            file.save(input_path)
+        else:
+            return jsonify({'music_file': ['Invalid file type.']}), 400
+
     try:
         target_output_subdir = filename
+        warning = None
         # Pass the file path (string) and output directory, not the file object
-        json_file, csv_file, lyrics_txt = transcribe_to_structured_data(input_path, output_dir, target_output_subdir)
+        if lyrics and lyrics.strip():
+            # Known lyrics: only align them, no recognition
+            try:
+                json_file, csv_file, lyrics_txt = align_to_structured_data(input_path, output_dir, target_output_subdir, lyrics, language)
+            except AudioTooLong as e:
+                # Too long for the aligner; the song still gets (recognized) lyrics
+                warning = f"{e} The lyrics were transcribed instead."
+                print(warning)
+                json_file, csv_file, lyrics_txt = transcribe_to_structured_data(input_path, output_dir, target_output_subdir, vad=vad)
+        else:
+            json_file, csv_file, lyrics_txt = transcribe_to_structured_data(input_path, output_dir, target_output_subdir, vad=vad)
         
         print("result:")
         print(json_file)
@@ -83,16 +155,27 @@ def transcribe_audio_endpoint():
             'lyrics_txt': lyrics_txt,
             'lyrics_json': lyrics_json_data,
         }
+        if warning:
+            results['warning'] = warning
         return jsonify(results), 200
 
+    except SchedulerFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '30'}
     except Exception as e:
         print(f"Exception during lyrics extraction: {e}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def load_models():
+    load_model(mark=startup.mark)
+    # Fork the chunk workers now, before any inference has started threads
+    if start_process_pool():
+        startup.mark("process_pool_forked")
+
 def main():
-    # Pre-initialize handler if possible
-    # get_separator()
+    # Load the models while Flask is already answering /health
+    startup.load_in_background(load_models)
+    startup.mark("serving")
     app.run(debug=False, port=5003, use_reloader=False)
 
 if __name__ == "__main__":
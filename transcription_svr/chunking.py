@@ -0,0 +1,78 @@
+"""Splitting long audio at quiet points and stitching the transcripts back together.
+
+Chunks that were cut mid-span are transcribed with a little overlap on each
+side so words at the cut aren't lost. Each chunk then only keeps the words
+whose midpoint falls inside its own stretch of the song, so nothing at a
+seam appears twice.
+"""
+
+from collections import namedtuple
+from types import SimpleNamespace
+
+import numpy as np
+
+from vad import frame_energy_db
+
+HOP_SECONDS = 0.01
+FRAME_SECONDS = 0.03
+
+# start/end: the part of the song this chunk is responsible for;
+# clip_start/clip_end: the audio actually sent to the model (start/end plus overlap)
+Chunk = namedtuple("Chunk", "start end clip_start clip_end")
+
+
+def plan_chunks(audio, sample_rate, spans, max_seconds=120.0, search_seconds=10.0, overlap=1.0):
+    """Split each (start, end) span into chunks of at most max_seconds.
+
+    Cuts go at the quietest frame in the last search_seconds before each
+    limit, which on a vocals stem (or a mix) is usually a breath or a gap
+    between lines.
+    """
+    search_seconds = min(search_seconds, max_seconds / 2)
+    duration = len(audio) / sample_rate
+    db = frame_energy_db(audio, sample_rate, FRAME_SECONDS, HOP_SECONDS)
+    chunks = []
+    for span_start, span_end in spans:
+        start = span_start
+        clip_start = span_start
+        while span_end - start > max_seconds:
+            lo = int((start + max_seconds - search_seconds) / HOP_SECONDS)
+            hi = min(int((start + max_seconds) / HOP_SECONDS), len(db))
+            cut = (lo + int(np.argmin(db[lo:hi]))) * HOP_SECONDS + FRAME_SECONDS / 2
+            chunks.append(Chunk(start, cut, clip_start, min(cut + overlap, duration)))
+            start = cut
+            clip_start = max(cut - overlap, 0.0)
+        chunks.append(Chunk(start, span_end, clip_start, span_end))
+    return chunks
+
+
+def clip_audio(audio, sample_rate, chunk):
+    # A writable copy: `audio` may be a read-only memory map of the front-end cache
+    return np.array(audio[int(chunk.clip_start * sample_rate):int(chunk.clip_end * sample_rate)], dtype=np.float32)
+
+
+def plain_transcription(transcription):
+    """A picklable copy of a model result with the fields the emitters use."""
+    time_stamps = None
+    if transcription.time_stamps is not None:
+        time_stamps = [
+            SimpleNamespace(start_time=item.start_time, end_time=item.end_time, text=item.text)
+            for item in transcription.time_stamps
+        ]
+    return SimpleNamespace(text=transcription.text, time_stamps=time_stamps)
+
+
+def to_song_time(transcription, chunk):
+    """Shift a chunk's word timestamps to song time and drop the words owned by a neighbour."""
+    result = plain_transcription(transcription)
+    if result.time_stamps is None:
+        return result
+    kept = []
+    for item in result.time_stamps:
+        item.start_time += chunk.clip_start
+        item.end_time += chunk.clip_start
+        midpoint = (item.start_time + item.end_time) / 2
+        if chunk.start <= midpoint < chunk.end:
+            kept.append(item)
+    result.time_stamps = kept
+    return result
@@ -0,0 +1,49 @@
+"""Audio front end: decode each song once to 16 kHz mono float32.
+
+Qwen3-ASR and the forced aligner both work on 16 kHz mono, so the decode,
+downmix and resample are done here once and the result is kept as a .npy
+next to the song's other outputs. Retries, re-transcriptions with a new
+model and re-alignment then memory-map that file instead of decoding the
+source again.
+"""
+
+import os
+import uuid
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+CACHE_SUFFIX = ".16k.npy"
+
+
+def decode_audio(path, sample_rate=SAMPLE_RATE):
+    """Decode `path` to mono float32 at `sample_rate`."""
+    import librosa
+    audio, _ = librosa.load(path, sr=sample_rate, mono=True)
+    return audio.astype(np.float32, copy=False)
+
+
+def cache_path_for(audio_path, cache_dir):
+    name = os.path.splitext(os.path.basename(audio_path))[0]
+    return os.path.join(cache_dir, name + CACHE_SUFFIX)
+
+
+def load_audio(audio_path, cache_dir=None):
+    """16 kHz mono samples of `audio_path`, read-only memory-mapped from the cache when possible."""
+    if cache_dir is None:
+        return decode_audio(audio_path)
+    cache_path = cache_path_for(audio_path, cache_dir)
+    try:
+        # Stale if the source was rewritten after the cache was made
+        if os.path.getmtime(cache_path) >= os.path.getmtime(audio_path):
+            return np.load(cache_path, mmap_mode="r")
+    except (OSError, ValueError):
+        pass
+
+    audio = decode_audio(audio_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, audio)
+    os.replace(tmp, cache_path)
+    return np.load(cache_path, mmap_mode="r")
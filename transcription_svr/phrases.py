@@ -0,0 +1,208 @@
+"""Phrase segmentation of timestamped words and the lyric file formats built from it.
+
+Works on the stored word list ({start, end, text} dicts, as in lyrics_json)
+without the model, so transcripts can be re-segmented in bulk after tuning
+the pause threshold. Everything is a single pass over the words: lines are
+collected in lists and joined once, and punctuation lookups in the raw text
+move a cursor forward through it, so the whole raw text is scanned about
+once however long the song is.
+
+    python phrases.py lyrics.json --format lrc --pause 0.8
+    python phrases.py --benchmark
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import namedtuple
+
+PUNCTUATION = ",.;?!"
+# How far ahead of the last match a word's text is searched for first in
+# raw_text, before searching the rest of it
+SEARCH_WINDOW = 64
+
+Phrase = namedtuple("Phrase", "start end text")
+
+
+def segment(words, pause=1.0, raw_text=None):
+    """Group words into phrases.
+
+    A phrase ends after a word carrying punctuation (its own, or what follows
+    it in `raw_text`, the model's punctuated transcript), and before a word
+    that starts more than `pause` seconds after the previous one ended.
+    """
+    phrases = []
+    current = []
+    phrase_start = 0.0
+    last_end = 0.0
+    search_idx = 0
+    # Words not found after some point of raw_text can't be found after any later point either
+    missing = set()
+
+    def flush():
+        if current:
+            phrases.append(Phrase(phrase_start, last_end, " ".join(current)))
+            current.clear()
+
+    for word in words:
+        text = word["text"].strip()
+        if not text:
+            continue
+        start, end = word["start"], word["end"]
+        if current and end > 0 and start - last_end > pause:
+            flush()
+
+        punct = ""
+        if raw_text is not None and text not in missing:
+            idx = raw_text.find(text, search_idx, search_idx + len(text) + SEARCH_WINDOW)
+            if idx < 0:
+                # Resync after raw text the aligner has no words for (e.g.
+                # dropped "la la la"s). The cursor only moves forward, so this
+                # stays linear overall.
+                idx = raw_text.find(text, search_idx)
+                if idx < 0:
+                    missing.add(text)
+            if idx >= 0:
+                end_of_word = idx + len(text)
+                while end_of_word < len(raw_text) and raw_text[end_of_word] in PUNCTUATION:
+                    end_of_word += 1
+                punct = raw_text[idx + len(text):end_of_word]
+                search_idx = end_of_word
+
+        if not current:
+            phrase_start = start
+        current.append(text + punct)
+        last_end = end
+        if punct or text[-1] in PUNCTUATION:
+            flush()
+    flush()
+    return phrases
+
+
+def phrases_from_lines(words, lines):
+    """Time each known lyric line from its aligned words, or None if the word counts don't match."""
+    counts = [len(line.split()) for line in lines]
+    if sum(counts) != len(words):
+        return None
+    phrases = []
+    i = 0
+    for line, count in zip(lines, counts):
+        if count:
+            phrases.append(Phrase(words[i]["start"], words[i + count - 1]["end"], line))
+        i += count
+    return phrases
+
+
+def to_txt(phrases):
+    if not phrases:
+        return "\n"
+    return "\n".join(phrase.text for phrase in phrases) + "\n"
+
+
+def to_json(words):
+    """Compact lyrics JSON: no indentation or spaces after separators."""
+    return json.dumps(words, ensure_ascii=False, separators=(",", ":"))
+
+
+def _lrc_time(seconds):
+    centis = int(round(max(seconds, 0.0) * 100))
+    minutes, centis = divmod(centis, 6000)
+    return f"[{minutes:02d}:{centis // 100:02d}.{centis % 100:02d}]"
+
+
+def to_lrc(phrases, title=None, artist=None):
+    lines = []
+    if title:
+        lines.append(f"[ti:{title}]")
+    if artist:
+        lines.append(f"[ar:{artist}]")
+    lines.extend(_lrc_time(phrase.start) + phrase.text for phrase in phrases)
+    return "\n".join(lines) + "\n"
+
+
+def _vtt_time(seconds):
+    millis = int(round(max(seconds, 0.0) * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    return f"{hours:02d}:{minutes:02d}:{millis // 1000:02d}.{millis % 1000:03d}"
+
+
+def to_vtt(phrases):
+    cues = ["WEBVTT", ""]
+    for phrase in phrases:
+        # A cue may not end before it starts (words without timestamps)
+        end = max(phrase.end, phrase.start)
+        cues.append(f"{_vtt_time(phrase.start)} --> {_vtt_time(end)}")
+        # A blank line would end the cue early
+        cues.append(phrase.text.replace("\n", " ").replace("-->", "->"))
+        cues.append("")
+    return "\n".join(cues)
+
+
+EMITTERS = {
+    "txt": lambda words, phrases: to_txt(phrases),
+    "json": lambda words, phrases: to_json(words),
+    "lrc": lambda words, phrases: to_lrc(phrases),
+    "vtt": lambda words, phrases: to_vtt(phrases),
+}
+
+
+def synthetic_words(count, seed=0):
+    """A word stream that looks like sung lyrics: short gaps, occasional long pauses and punctuation."""
+    rng = random.Random(seed)
+    vocabulary = ["love", "night", "baby", "heart", "fire", "dance", "tonight", "never", "forever", "you", "me", "oh"]
+    words = []
+    t = 0.0
+    for _ in range(count):
+        t += rng.choice((0.05, 0.1, 0.2, 0.3)) if rng.random() > 0.05 else rng.uniform(1.5, 4.0)
+        duration = rng.uniform(0.15, 0.6)
+        text = rng.choice(vocabulary)
+        if rng.random() < 0.08:
+            text += rng.choice(PUNCTUATION)
+        words.append({"start": round(t, 3), "end": round(t + duration, 3), "text": text})
+        t += duration
+    return words
+
+
+def benchmark(sizes=(1000, 10000, 100000), repeat=5):
+    """Time segmentation and each emitter; per-word cost should stay flat as the input grows."""
+    print(f"{'words':>8} {'stage':<8} {'best ms':>9} {'ns/word':>9}")
+    for size in sizes:
+        words = synthetic_words(size)
+        raw_text = " ".join(word["text"] for word in words)
+        stages = {"segment": lambda: segment(words, raw_text=raw_text)}
+        phrases = segment(words, raw_text=raw_text)
+        for name, emit in EMITTERS.items():
+            stages[name] = lambda emit=emit: emit(words, phrases)
+        for name, run in stages.items():
+            best = min(_timed(run) for _ in range(repeat))
+            print(f"{size:>8} {name:<8} {best * 1000:>9.2f} {best / size * 1e9:>9.0f}")
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-segment stored lyrics JSON into TXT/JSON/LRC/VTT.")
+    parser.add_argument("lyrics_json", nargs="?", help="File with a list of {start, end, text} words")
+    parser.add_argument("--format", choices=sorted(EMITTERS), default="txt")
+    parser.add_argument("--pause", type=float, default=1.0, help="Break phrases on gaps longer than this (seconds)")
+    parser.add_argument("--benchmark", action="store_true", help="Time segmentation and emitters on synthetic words")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    if not args.lyrics_json:
+        parser.error("lyrics_json is required unless --benchmark is given")
+    with open(args.lyrics_json, encoding="utf-8") as f:
+        words = json.load(f)
+    print(EMITTERS[args.format](words, segment(words, pause=args.pause)), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""On-disk cache of finished transcriptions.
+
+Entries are keyed by a hash of the decoded 16 kHz audio together with
+everything that affects the output (model IDs and versions, precision,
+device, VAD/chunking/alignment parameters), so retries and re-queues of the
+same audio return straight away, while a model upgrade or a settings
+change simply misses. The directory is bounded in size; the least recently
+used entries (by file mtime, refreshed on every hit) are evicted first.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+
+class TranscriptionCache:
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._sizes = {}
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+            for name in os.listdir(root):
+                if name.endswith(".json"):
+                    try:
+                        self._sizes[name] = os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(audio, config):
+        digest = hashlib.sha256()
+        digest.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+        digest.update(memoryview(audio).cast("B"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".json")
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path) # most recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        if not self.enabled:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+        with self._lock:
+            self._sizes[os.path.basename(path)] = os.path.getsize(path)
+            self._evict()
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        def mtime(name):
+            try:
+                return os.path.getmtime(os.path.join(self.root, name))
+            except OSError:
+                return 0
+        for name in sorted(self._sizes, key=mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.root, name))
+            except OSError:
+                pass
+            total -= self._sizes.pop(name)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._sizes),
+                "bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,166 @@
+"""In-process scheduling of ASR inference requests.
+
+Flask serves requests on many threads, but the model should only run a
+bounded number of inference calls at once. Requests go into a queue. Each
+of `max_concurrency` dispatcher threads takes the oldest one, waits up to
+`batch_window` seconds for more to arrive (up to `max_batch_size`, counted
+with `item_size`, e.g. in clips), and runs them through the model as one
+batch. The queue is bounded, so under overload callers are turned away
+quickly instead of piling up behind the model.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+
+class SchedulerFull(Exception):
+    pass
+
+
+class _Request:
+    def __init__(self, item):
+        self.item = item
+        self.enqueued = time.perf_counter()
+        self.started = None
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+class InferenceScheduler:
+    def __init__(self, infer_batch, max_concurrency=1, max_batch_size=4, batch_window=0.05, max_queue=32, history=1000, item_size=None):
+        """infer_batch(items) must return one result per item, in order.
+
+        item_size(item) is how much of max_batch_size an item takes up
+        (1 if not given). An item bigger than max_batch_size still runs, in
+        a batch of its own.
+        """
+        self.infer_batch = infer_batch
+        self.item_size = item_size or (lambda item: 1)
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._batches = 0
+        self._batched_size = 0
+        self._latencies = deque(maxlen=history) # enqueue -> result, seconds
+        self._waits = deque(maxlen=history) # enqueue -> inference start, seconds
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.max_concurrency):
+                thread = threading.Thread(target=self._dispatch, name=f"inference-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, item, timeout=None):
+        """Queue `item` for inference and block until its result is ready."""
+        self._start()
+        request = _Request(item)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            raise SchedulerFull(f"Inference queue is full ({self._queue.maxsize} waiting)")
+        if not request.done.wait(timeout):
+            raise TimeoutError(f"Inference did not finish within {timeout}s")
+        if request.error:
+            raise request.error
+        return request.result
+
+    def _collect_batch(self, carry=None):
+        """The next batch, and the request that didn't fit in it (it starts the next one)."""
+        batch = [carry if carry is not None else self._queue.get()]
+        size = self.item_size(batch[0].item)
+        deadline = time.perf_counter() + self.batch_window
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            request_size = self.item_size(request.item)
+            if size + request_size > self.max_batch_size:
+                return batch, size, request
+            batch.append(request)
+            size += request_size
+        return batch, size, None
+
+    def _dispatch(self):
+        carry = None
+        while True:
+            batch, size, carry = self._collect_batch(carry)
+            started = time.perf_counter()
+            for request in batch:
+                request.started = started
+            with self._lock:
+                self._running += len(batch)
+                self._batches += 1
+                self._batched_size += size
+            try:
+                results = self.infer_batch([request.item for request in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Inference returned {len(results)} results for {len(batch)} inputs")
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].error = e
+                else:
+                    # Don't let one bad clip fail the others: retry them one by one
+                    for request in batch:
+                        try:
+                            request.result = self.infer_batch([request.item])[0]
+                        except Exception as single_error:
+                            request.error = single_error
+            finally:
+                self._finish(batch)
+
+    def _finish(self, batch):
+        finished = time.perf_counter()
+        with self._lock:
+            self._running -= len(batch)
+            for request in batch:
+                if request.error:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                self._latencies.append(finished - request.enqueued)
+                self._waits.append(request.started - request.enqueued)
+        for request in batch:
+            request.done.set()
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            waits = sorted(self._waits)
+            return {
+                'queued': self._queue.qsize(),
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'batches': self._batches,
+                'mean_batch_size': round(self._batched_size / self._batches, 2) if self._batches else None,
+                'max_concurrency': self.max_concurrency,
+                'max_batch_size': self.max_batch_size,
+                'batch_window_ms': self.batch_window * 1000,
+                'latency_s': {'p50': _percentile(latencies, 0.5), 'p95': _percentile(latencies, 0.95), 'p99': _percentile(latencies, 0.99)},
+                'queue_wait_s': {'p50': _percentile(waits, 0.5), 'p99': _percentile(waits, 0.99)},
+            }
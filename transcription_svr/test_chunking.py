@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from chunking import Chunk, plan_chunks, to_song_time
+
+SAMPLE_RATE = 1000
+
+
+def transcription(*words):
+    return SimpleNamespace(
+        text=" ".join(text for _, _, text in words),
+        time_stamps=[SimpleNamespace(start_time=start, end_time=end, text=text) for start, end, text in words],
+    )
+
+def words(result):
+    return [(round(item.start_time, 3), round(item.end_time, 3), item.text) for item in result.time_stamps]
+
+def test_long_span_is_cut_at_the_quiet_points():
+    audio = np.full(300 * SAMPLE_RATE, 0.5, dtype=np.float32)
+    audio[115000:115500] = 0 # a breath inside the search window before 120 s
+    audio[230000:230500] = 0 # and before 115 + 120 s
+    chunks = plan_chunks(audio, SAMPLE_RATE, [(0.0, 300.0)], max_seconds=120.0, search_seconds=10.0, overlap=1.0)
+
+    # Each cut is the middle of the first silent frame
+    assert [tuple(round(value, 3) for value in chunk) for chunk in chunks] == [
+        (0.0, 115.015, 0.0, 116.015),
+        (115.015, 230.015, 114.015, 231.015),
+        (230.015, 300.0, 229.015, 300.0),
+    ]
+
+def test_short_spans_are_kept_whole():
+    audio = np.full(60 * SAMPLE_RATE, 0.5, dtype=np.float32)
+    assert plan_chunks(audio, SAMPLE_RATE, [(5.0, 20.0), (40.0, 60.0)], max_seconds=30.0) == [
+        Chunk(5.0, 20.0, 5.0, 20.0),
+        Chunk(40.0, 60.0, 40.0, 60.0),
+    ]
+
+def test_timestamps_are_shifted_to_song_time():
+    chunk = Chunk(115.0, 230.0, 114.0, 231.0)
+    result = to_song_time(transcription((50.0, 50.5, "middle"), (110.0, 110.5, "later")), chunk)
+    assert words(result) == [(164.0, 164.5, "middle"), (224.0, 224.5, "later")]
+
+def test_word_at_a_seam_is_kept_once():
+    before = Chunk(0.0, 115.0, 0.0, 116.0)
+    after = Chunk(115.0, 230.0, 114.0, 231.0)
+    # The same word, sung from 114.9 to 115.3 s, as both chunks hear it
+    first = to_song_time(transcription((114.0, 114.5, "tail"), (114.9, 115.3, "seam")), before)
+    second = to_song_time(transcription((0.9, 1.3, "seam"), (2.0, 2.5, "next")), after)
+    assert words(first) == [(114.0, 114.5, "tail")]
+    assert words(second) == [(114.9, 115.3, "seam"), (116.0, 116.5, "next")]
+
+def test_original_result_is_left_alone():
+    original = transcription((1.0, 1.5, "word"))
+    to_song_time(original, Chunk(10.0, 20.0, 9.0, 21.0))
+    assert original.time_stamps[0].start_time == 1.0
+
+def test_result_without_timestamps():
+    result = to_song_time(SimpleNamespace(text="la la", time_stamps=None), Chunk(0.0, 10.0, 0.0, 10.0))
+    assert result.text == "la la" and result.time_stamps is None
@@ -0,0 +1,23 @@
+from phrases import Phrase, segment
+
+
+def words_at(*texts):
+    return [{"start": i * 0.5, "end": i * 0.5 + 0.25, "text": text} for i, text in enumerate(texts)]
+
+def test_punctuation_comes_from_raw_text():
+    phrases = segment(words_at("Hello", "there", "friend"), raw_text="Hello there, friend!")
+    assert [phrase.text for phrase in phrases] == ["Hello there,", "friend!"]
+
+def test_resyncs_after_raw_text_without_words():
+    # The aligner dropped the "la"s, a stretch longer than the search window
+    raw_text = "Hello world. " + "la " * 40 + "goodbye, my love."
+    phrases = segment(words_at("Hello", "world", "goodbye", "my", "love"), raw_text=raw_text)
+    assert [phrase.text for phrase in phrases] == ["Hello world.", "goodbye,", "my love."]
+
+def test_word_missing_from_raw_text_keeps_the_cursor():
+    phrases = segment(words_at("yeah", "stay", "here", "yeah", "stay", "here"), raw_text="stay here, stay here.")
+    assert [phrase.text for phrase in phrases] == ["yeah stay here,", "yeah stay here."]
+
+def test_long_pause_starts_a_phrase():
+    words = words_at("one", "two") + [{"start": 5.0, "end": 5.5, "text": "three"}]
+    assert segment(words, pause=1.0) == [Phrase(0.0, 0.75, "one two"), Phrase(5.0, 5.5, "three")]
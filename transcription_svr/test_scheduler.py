@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scheduler import InferenceScheduler, SchedulerFull
+
+
+class Model:
+    """A fake infer_batch that records its batches and can be held mid-inference."""
+
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, items):
+        with self._lock:
+            self.batches.append(list(items))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        self.gate.wait(5)
+        with self._lock:
+            self.running -= 1
+        if "bad" in items:
+            raise ValueError("bad clip")
+        return [item.upper() for item in items]
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise AssertionError("timed out waiting")
+        time.sleep(0.005)
+
+@pytest.fixture
+def callers():
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        yield pool
+
+def submit_in_order(scheduler, callers, items):
+    """Submit from background threads, one after the other, so the queue keeps their order."""
+    futures = []
+    for item in items:
+        queued = scheduler.stats()['queued']
+        futures.append(callers.submit(scheduler.submit, item, 5))
+        wait_until(lambda: scheduler.stats()['queued'] > queued)
+    return futures
+
+def test_waiting_requests_share_a_batch(callers):
+    model = Model()
+    scheduler = InferenceScheduler(model, max_batch_size=3, batch_window=0.05)
+    # The first request holds the model while the rest queue up behind it
+    busy = callers.submit(scheduler.submit, "x", 5)
+    wait_until(lambda: model.batches)
+    futures = submit_in_order(scheduler, callers, ["a", "b", "c", "d"])
+    model.gate.set()
+
+    assert busy.result() == "X"
+    assert [future.result() for future in futures] == ["A", "B", "C", "D"]
+    assert model.batches[1:] == [["a", "b", "c"], ["d"]]
+
+def test_batches_are_limited_by_item_size(callers):
+    model = Model()
+    scheduler = InferenceScheduler(model, max_batch_size=4, batch_window=0.05, item_size=len)
+    callers.submit(scheduler.submit, "xxxx", 5)
+    wait_until(lambda: model.batches)
+    futures = submit_in_order(scheduler, callers, ["aaa", "bb", "c", "eeeee"])
+    model.gate.set()
+
+    assert [future.result() for future in futures] == ["AAA", "BB", "C", "EEEEE"]
+    # "bb" doesn't fit after "aaa" and starts the next batch instead of
+    # waiting its turn again; "eeeee" is too big for any batch and runs alone
+    assert model.batches == [["xxxx"], ["aaa"], ["bb", "c"], ["eeeee"]]
+    assert scheduler.stats()['batches'] == 4
+
+def test_concurrency_is_limited(callers):
+    model = Model()
+    scheduler = InferenceScheduler(model, max_concurrency=2, max_batch_size=1)
+    futures = [callers.submit(scheduler.submit, item, 5) for item in "abcde"]
+    wait_until(lambda: model.running == 2 and scheduler.stats()['queued'] == 3)
+    assert scheduler.stats()['running'] == 2
+    model.gate.set()
+
+    assert sorted(future.result() for future in futures) == ["A", "B", "C", "D", "E"]
+    assert model.peak == 2
+
+def test_bad_item_fails_only_its_own_request(callers):
+    model = Model()
+    scheduler = InferenceScheduler(model, max_batch_size=3, batch_window=0.05)
+    busy = callers.submit(scheduler.submit, "x", 5)
+    wait_until(lambda: model.batches)
+    good, bad, other = submit_in_order(scheduler, callers, ["a", "bad", "b"])
+    model.gate.set()
+
+    busy.result()
+    assert good.result() == "A" and other.result() == "B"
+    with pytest.raises(ValueError):
+        bad.result()
+    # The failed batch is retried one item at a time
+    assert model.batches[1:] == [["a", "bad", "b"], ["a"], ["bad"], ["b"]]
+    assert scheduler.stats()['failed'] == 1
+
+def test_full_queue_turns_callers_away(callers):
+    model = Model()
+    scheduler = InferenceScheduler(model, max_batch_size=1, max_queue=1)
+    running = callers.submit(scheduler.submit, "a", 5)
+    wait_until(lambda: model.batches)
+    queued = submit_in_order(scheduler, callers, ["b"])[0]
+
+    with pytest.raises(SchedulerFull):
+        scheduler.submit("c")
+    model.gate.set()
+    assert running.result() == "A" and queued.result() == "B"
@@ -0,0 +1,29 @@
+import numpy as np
+
+from vad import voiced_regions
+
+SAMPLE_RATE = 1000
+
+
+def stem(seconds, *sung):
+    """A silent stem with a steady tone over each (start, end) stretch."""
+    audio = np.zeros(seconds * SAMPLE_RATE, dtype=np.float32)
+    for start, end in sung:
+        audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] = 0.5
+    return audio
+
+def regions(audio):
+    return [(round(start, 3), round(end, 3)) for start, end in voiced_regions(audio, SAMPLE_RATE)]
+
+def test_short_gaps_are_bridged_and_blips_dropped():
+    # A 1 s breath inside the verse, and a 0.1 s click in the outro
+    audio = stem(20, (5, 10), (11, 14), (17, 17.1))
+    # Frames reaching into the tone count as voiced, then 0.4 s of padding
+    assert regions(audio) == [(4.58, 14.42)]
+
+def test_long_silence_splits_regions_and_padding_stays_in_the_track():
+    audio = stem(20, (0, 3), (8, 20))
+    assert regions(audio) == [(0.0, 3.42), (7.58, 20.0)]
+
+def test_silent_stem_has_no_regions():
+    assert regions(stem(10)) == []
@@ -1,39 +1,277 @@
-import json
 import csv
+import importlib.metadata
+import multiprocessing as mp
+import os
+import re
+import signal
 import sys
-import torch
-from qwen_asr import Qwen3ASRModel
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from types import SimpleNamespace
+import numpy as np
+from phrases import Phrase, phrases_from_lines, segment, to_json, to_lrc, to_txt, to_vtt
+from chunking import clip_audio, plain_transcription, plan_chunks, to_song_time
+from scheduler import InferenceScheduler
+from frontend import SAMPLE_RATE, load_audio
+from result_cache import TranscriptionCache
+from vad import voiced_regions
 
-# global singleton to prevent concurrent OOM crashes
-print("Initializing Qwen3 ASR Model into global memory. This may take a moment...")
-MODEL = Qwen3ASRModel.from_pretrained(
-    "Qwen/Qwen3-ASR-1.7B", 
-    forced_aligner="Qwen/Qwen3-ForcedAligner-0.6B",
-    dtype=torch.float32
+ASR_MODEL = "Qwen/Qwen3-ASR-1.7B"
+ALIGNER_MODEL = "Qwen/Qwen3-ForcedAligner-0.6B"
+# Inference precision for the ASR model and forced aligner:
+#   fp32 - full precision (the reference)
+#   bf16 - bfloat16 weights and activations; fast on GPUs and on CPUs with
+#          AVX512-BF16/AMX, emulated (slow) elsewhere
+#   int8 - dynamic int8 quantization of the Linear layers (CPU only)
+#   auto - bf16 where the hardware supports it, otherwise int8 on CPU
+# scripts/benchmark_asr_precision.py compares them on reference clips.
+PRECISIONS = ("fp32", "bf16", "int8", "auto")
+ASR_PRECISION = os.environ.get("ASR_PRECISION", "fp32")
+# Phrases break on gaps between words longer than this many seconds
+PHRASE_PAUSE = float(os.environ.get("PHRASE_PAUSE", 1.0))
+
+# torch and qwen_asr take seconds to import and the models far longer to
+# load, so both happen in load_model() rather than at import time.
+MODEL = None
+MODEL_CONFIG = None # what was actually loaded: models, precision, device
+_model_lock = threading.Lock()
+
+def cpu_supports_bf16():
+    """True if the CPU does bf16 matmuls natively rather than by emulation."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = set(f.read().split())
+        # x86: AVX512-BF16 or AMX; aarch64: the bf16 feature
+        return bool(flags & {"avx512_bf16", "amx_bf16", "bf16"})
+    except OSError:
+        pass
+    import torch
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+def resolve_precision(precision, device):
+    import torch
+    if precision not in PRECISIONS:
+        raise ValueError(f"ASR precision must be one of {PRECISIONS}, not {precision!r}")
+    if precision == "auto":
+        if device == "cuda":
+            return "bf16" if torch.cuda.is_bf16_supported() else "fp32"
+        return "bf16" if cpu_supports_bf16() else "int8"
+    if precision == "int8" and device != "cpu":
+        print("int8 dynamic quantization only runs on CPU; using fp32 on the GPU instead.")
+        return "fp32"
+    if precision == "bf16" and device == "cpu" and not cpu_supports_bf16():
+        print("Warning: this CPU has no native bf16 support; bf16 inference will be emulated and may be slower than fp32.")
+    return precision
+
+def load_model(mark=None, precision=None):
+    """Load the global Qwen3 ASR model and forced aligner once; safe to call from several threads."""
+    global MODEL, MODEL_CONFIG
+    with _model_lock:
+        if MODEL is not None:
+            return MODEL
+        import torch
+        from qwen_asr import Qwen3ASRModel
+        if mark:
+            mark("torch_imported")
+
+        # Determine the best available device (use CUDA if on an NVIDIA GPU, fallback to CPU)
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        precision = resolve_precision(precision or ASR_PRECISION, device)
+
+        # global singleton to prevent concurrent OOM crashes
+        print(f"Initializing Qwen3 ASR Model ({precision} on {device}) into global memory. This may take a moment...")
+        model = Qwen3ASRModel.from_pretrained(
+            ASR_MODEL,
+            forced_aligner=ALIGNER_MODEL,
+            dtype=torch.bfloat16 if precision == "bf16" else torch.float32
+        )
+        if mark:
+            mark("model_loaded")
+
+        # Move the inner PyTorch model and aligner to the selected device
+        modules = [model.model]
+        if hasattr(model, "forced_aligner") and model.forced_aligner:
+            modules.append(model.forced_aligner.model)
+        for module in modules:
+            module.to(device)
+            if precision == "int8":
+                # Weights stored as int8, activations quantized on the fly
+                torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        if mark:
+            mark(f"model_on_{device}_{precision}")
+        print("Model initialized successfully!")
+        MODEL = model
+        MODEL_CONFIG = {"asr": ASR_MODEL, "aligner": ALIGNER_MODEL, "precision": precision, "device": device}
+        return MODEL
+
+# Most clips passed to the model in one call, across all batched requests
+TRANSCRIBE_MAX_BATCH = int(os.environ.get("TRANSCRIBE_MAX_BATCH", 4))
+
+def _transcribe_batch(jobs):
+    """Run several requests' clips through the model, TRANSCRIBE_MAX_BATCH clips per call.
+
+    Each job is a list of (samples, sample_rate) clips; the result for a job
+    is the list of its transcriptions. The scheduler counts clips, so only a
+    single song with more clips than that takes several calls. Batches of
+    several clips go to the chunk worker processes when there are any; this
+    runs on a scheduler thread, so they count against TRANSCRIBE_CONCURRENCY
+    like in-process inference does.
+    """
+    inputs = [audio for job in jobs for audio in job]
+    results = _transcribe_in_processes(inputs) if len(inputs) > 1 else None
+    if results is None:
+        results = []
+        for start in range(0, len(inputs), TRANSCRIBE_MAX_BATCH):
+            results.extend(load_model().transcribe(inputs[start:start + TRANSCRIBE_MAX_BATCH], return_time_stamps=True))
+    split = []
+    for job in jobs:
+        split.append(results[:len(job)])
+        results = results[len(job):]
+    return split
+
+# Every transcription goes through the scheduler, so concurrent requests
+# share the model in bounded, batched calls instead of all at once.
+scheduler = InferenceScheduler(
+    _transcribe_batch,
+    max_concurrency=int(os.environ.get("TRANSCRIBE_CONCURRENCY", 1)),
+    max_batch_size=TRANSCRIBE_MAX_BATCH,
+    batch_window=float(os.environ.get("TRANSCRIBE_BATCH_WINDOW_MS", 50)) / 1000,
+    max_queue=int(os.environ.get("TRANSCRIBE_MAX_QUEUE", 32)),
+    # A request is a song's list of clips; batches are limited in clips
+    item_size=len,
 )
 
-# Determine the best available device (use CUDA if on an NVIDIA GPU, fallback to CPU)
-device = "cuda" if torch.cuda.is_available() else "cpu"
+# Long tracks are cut at quiet points into chunks of at most this length.
+# With TRANSCRIBE_PROCESSES > 1 (and the model on the CPU) the clips of a
+# scheduled batch, such as a long song's chunks, are transcribed in parallel
+# by worker processes forked once, right after the model is loaded, which
+# share its weights copy-on-write instead of each loading a copy.
+CHUNK_SECONDS = float(os.environ.get("TRANSCRIBE_CHUNK_SECONDS", 120))
+CHUNK_OVERLAP = float(os.environ.get("TRANSCRIBE_CHUNK_OVERLAP", 1.0))
+TRANSCRIBE_PROCESSES = int(os.environ.get("TRANSCRIBE_PROCESSES", 1))
+# Wall-clock seconds a worker may take per second of audio before it is
+# presumed hung and the batch falls back to in-process inference
+CHUNK_TIMEOUT_FACTOR = float(os.environ.get("TRANSCRIBE_CHUNK_TIMEOUT_FACTOR", 5))
+CHUNK_TIMEOUT_MIN = 60
+_process_pool = None
+_process_pool_pids = []
+_process_pool_started = False
+_process_pool_lock = threading.Lock()
 
-# Move the inner PyTorch model and aligner to the selected device
-MODEL.model.to(device)
-if hasattr(MODEL, "forced_aligner") and MODEL.forced_aligner:
-    MODEL.forced_aligner.model.to(device)
-print("Model initialized successfully!")
+def _init_clip_worker(num_threads, pids):
+    import torch
+    # The workers share the machine; don't let each grab every core
+    torch.set_num_threads(num_threads)
+    pids.put(os.getpid())
 
-def transcribe_to_structured_data(audio_file, output_dir, output_name):
+def _transcribe_clip(clip):
+    # Runs in a forked worker, where MODEL is the parent's, shared copy-on-write
+    return plain_transcription(MODEL.transcribe([clip], return_time_stamps=True)[0])
+
+def start_process_pool():
+    """Fork the chunk workers. Called once by the app right after the model loads, before any inference.
+
+    Returns None if disabled, unsupported (no fork, e.g. Windows) or the
+    model is on a GPU, which forked children can't use. Nothing is ever
+    forked later: a pool that fails is dropped, not replaced, since by then
+    the process has serving and inference threads.
+    """
+    global _process_pool, _process_pool_pids, _process_pool_started
+    with _process_pool_lock:
+        if _process_pool_started:
+            return _process_pool
+        _process_pool_started = True
+        if TRANSCRIBE_PROCESSES <= 1 or "fork" not in mp.get_all_start_methods():
+            return None
+        load_model()
+        if MODEL_CONFIG["device"] != "cpu":
+            print(f"Not forking transcription workers: the model is on {MODEL_CONFIG['device']}, which forked processes can't use.")
+            return None
+        threads = max(1, (os.cpu_count() or 1) // TRANSCRIBE_PROCESSES)
+        print(f"Forking {TRANSCRIBE_PROCESSES} transcription workers ({threads} threads each)...")
+        # Unlike multiprocessing.Pool, the executor never forks a replacement
+        # for a worker that dies; it fails the pending calls straight away.
+        ctx = mp.get_context("fork")
+        pids = ctx.Queue()
+        pool = ProcessPoolExecutor(TRANSCRIBE_PROCESSES, mp_context=ctx, initializer=_init_clip_worker, initargs=(threads, pids))
+        # With fork, every worker is started on the first submit: do it now.
+        # Each reports its pid, so a hung one can be killed later.
+        pool.submit(os.getpid).result()
+        _process_pool_pids = [pids.get(timeout=60) for _ in range(TRANSCRIBE_PROCESSES)]
+        _process_pool = pool
+        return pool
+
+def _pool_timeout(clips):
+    longest = max(len(samples) / sample_rate for samples, sample_rate in clips)
+    rounds = -(-len(clips) // TRANSCRIBE_PROCESSES)
+    return max(CHUNK_TIMEOUT_MIN, CHUNK_TIMEOUT_FACTOR * longest * rounds)
+
+def _drop_process_pool(pool):
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not pool:
+            return
+        _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+    # A hung worker would never pick up the shutdown, so kill them all
+    for pid in _process_pool_pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+def _transcribe_in_processes(clips):
+    pool = _process_pool
+    if pool is None:
+        return None
+    try:
+        return list(pool.map(_transcribe_clip, clips, timeout=_pool_timeout(clips)))
+    except Exception as e:
+        # A worker died or hung; drop the pool for good and let the caller fall back
+        print(f"Process pool transcription failed ({e!r}); using in-process inference from now on.")
+        _drop_process_pool(pool)
+        return None
+
+def transcribe_to_structured_data(audio_file, output_dir, output_name, vad=False):
     """
     Transcribes audio using Qwen3-ASR and saves the results 
     with timestamps to both JSON and CSV files.
+
+    With vad=True (for separated vocal stems) only the sung regions are
+    transcribed. Long stretches are split into chunks at quiet points, and
+    every chunk's timestamps are shifted back to song time.
     """
     # Transcribe with the timestamp flag set to True
     print(f"Processing: {audio_file}...")
-    results = MODEL.transcribe(audio_file, return_time_stamps=True)
+    # Decoded once per song and memory-mapped on every later run
+    audio = load_audio(audio_file, cache_dir=output_dir)
+    cache_key = result_cache.key(audio, cache_config("transcribe", vad=vad))
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        print(f"Transcription cache hit for {audio_file}")
+        results = [_from_cached(transcription) for transcription in cached["transcriptions"]]
+        return save_outputs(cached["words"], build_phrases(results), output_dir, output_name)
+
+    duration = len(audio) / SAMPLE_RATE
+    if vad:
+        spans = voiced_regions(audio, SAMPLE_RATE)
+        voiced = sum(end - start for start, end in spans)
+        print(f"VAD: {len(spans)} voiced regions, {voiced:.0f}s of {duration:.0f}s sent to ASR")
+    else:
+        spans = [(0.0, duration)]
+    chunks = plan_chunks(audio, SAMPLE_RATE, spans, max_seconds=CHUNK_SECONDS, overlap=CHUNK_OVERLAP)
+    clips = [(clip_audio(audio, SAMPLE_RATE, chunk), SAMPLE_RATE) for chunk in chunks]
+
+    raw_results = scheduler.submit(clips)
+    results = [to_song_time(transcription, chunk) for transcription, chunk in zip(raw_results, chunks)]
 
     # Convert results into a serializable list
     data_to_save = []
-    for transcription in results:
+    for transcription, chunk in zip(results, chunks):
         if transcription.time_stamps is not None:
             for item in transcription.time_stamps:
                 data_to_save.append({
@@ -43,88 +281,172 @@ def transcribe_to_structured_data(audio_file, output_dir, output_name):
                 })
         else:
              data_to_save.append({
-                "start": 0.0,
-                "end": 0.0,
+                "start": chunk.start,
+                "end": chunk.start,
                 "text": transcription.text.strip()
             })
-    # Create text file with one line per phrase
-    txt_filename = f"{output_name}.txt"
-    txt_path = Path(output_dir) / txt_filename
-    with open(txt_path, 'w', encoding='utf-8') as f:
-        lyrics_txt = ""
-        
-        # Iterate over results to align punctuation from raw transcription text with timestamps
-        for transcription in results:
-            if not transcription.text:
-                continue
-                
-            raw_text = transcription.text.strip()
-            
-            # If no timestamps available, just use regex to break on punctuation
-            if transcription.time_stamps is None:
-                import re
-                lyrics_txt += re.sub(r'([,.;?!])\s+', r'\1\n', raw_text) + "\n"
-                continue
-
-            current_line = ""
-            last_end = 0.0
-            search_idx = 0
-            
-            for item in transcription.time_stamps:
-                word = item.text.strip()
-                start = item.start_time
-                end = item.end_time
-                
-                # Break phrase on long pause (> 1.0 seconds)
-                if current_line and end > 0 and (start - last_end) > 1.0:
-                    lyrics_txt += current_line.strip() + "\n"
-                    current_line = ""
-                    
-                word_idx = raw_text.find(word, search_idx)
-                punct = ""
-                if word_idx >= 0:
-                    end_of_word = word_idx + len(word)
-                    while end_of_word < len(raw_text) and raw_text[end_of_word] in ",.;?!":
-                        punct += raw_text[end_of_word]
-                        end_of_word += 1
-                    search_idx = end_of_word
-
-                if current_line:
-                    current_line += " " + word + punct
-                else:
-                    current_line += word + punct
-                    
-                last_end = end
-                
-                # Break phrase on punctuation (either extracted or intrinsic)
-                if punct or (word and word[-1] in ",.;?!"):
-                    lyrics_txt += current_line.strip() + "\n"
-                    current_line = ""
-
-            if current_line:
-                lyrics_txt += current_line.strip() + "\n"
-
-        # Clean up empty lines and trailing spaces
-        lyrics_txt = "\n".join([line.strip() for line in lyrics_txt.splitlines() if line.strip()]) + "\n"
-
-        print("writing transcription:\n" + lyrics_txt)
-        f.write(lyrics_txt)
-
-    # Save to JSON
-    json_filename = f"{output_name}.json"
-    json_path = Path(output_dir) / json_filename
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(data_to_save, f, indent=4, ensure_ascii=False)
+
+    result_cache.put(cache_key, {
+        "words": data_to_save,
+        "transcriptions": [_to_cached(transcription) for transcription in results],
+    })
+    return save_outputs(data_to_save, build_phrases(results), output_dir, output_name)
+
+# Forced-alignment requests get their own scheduler with the same limits
+ALIGN_LANGUAGE = os.environ.get("ALIGN_LANGUAGE", "English")
+# The forced aligner only supports clips of up to about five minutes, and
+# known lyrics can't be split across chunks without knowing their timing;
+# longer songs are transcribed instead (see app.py)
+ALIGN_MAX_SECONDS = float(os.environ.get("ALIGN_MAX_SECONDS", 300))
+
+class AudioTooLong(ValueError):
+    """The audio is longer than the forced aligner supports."""
+
+def _align_batch(jobs):
+    """Align several (clip, text, language) jobs in one aligner call; one word list per job."""
+    model = load_model()
+    if not getattr(model, "forced_aligner", None):
+        raise RuntimeError("The forced aligner is not loaded")
+    results = model.forced_aligner.align(
+        audio=[clip for clip, _, _ in jobs],
+        text=[text for _, text, _ in jobs],
+        language=[language for _, _, language in jobs],
+    )
+    return [
+        [SimpleNamespace(start_time=item.start_time, end_time=item.end_time, text=item.text) for item in result]
+        for result in results
+    ]
+
+align_scheduler = InferenceScheduler(
+    _align_batch,
+    max_concurrency=int(os.environ.get("TRANSCRIBE_CONCURRENCY", 1)),
+    max_batch_size=TRANSCRIBE_MAX_BATCH,
+    batch_window=float(os.environ.get("TRANSCRIBE_BATCH_WINDOW_MS", 50)) / 1000,
+    max_queue=int(os.environ.get("TRANSCRIBE_MAX_QUEUE", 32)),
+)
+
+def align_to_structured_data(audio_file, output_dir, output_name, lyrics, language=None):
+    """
+    Aligns known lyrics to the audio with the forced aligner alone, skipping
+    recognition, and saves the same outputs as
+    transcribe_to_structured_data. The lyric lines are kept as the phrases.
+    """
+    lines = [line.strip() for line in lyrics.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("No lyrics to align")
+
+    print(f"Aligning {len(lines)} lyric lines to {audio_file}...")
+    audio = load_audio(audio_file, cache_dir=output_dir)
+    duration = len(audio) / SAMPLE_RATE
+    if duration > ALIGN_MAX_SECONDS:
+        raise AudioTooLong(f"Lyrics can only be aligned to audio up to {ALIGN_MAX_SECONDS:.0f}s long; this is {duration:.0f}s.")
+    text = " ".join(lines)
+    language = language or ALIGN_LANGUAGE
+    cache_key = result_cache.key(audio, cache_config("align", text=text, language=language))
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        print(f"Alignment cache hit for {audio_file}")
+        data_to_save = cached["words"]
+    else:
+        clip = (np.array(audio, dtype=np.float32), SAMPLE_RATE)
+        words = align_scheduler.submit((clip, text, language))
+        data_to_save = [{"start": word.start_time, "end": word.end_time, "text": word.text.strip()} for word in words]
+        result_cache.put(cache_key, {"words": data_to_save})
+
+    # Time the user's lines from their words. If the aligner split words
+    # differently, the LRC/VTT cues fall back to pause-based phrases, but the
+    # text output still has the user's lines.
+    lyrics_phrases = phrases_from_lines(data_to_save, lines)
+    if lyrics_phrases is None:
+        lyrics_phrases = segment(data_to_save, pause=PHRASE_PAUSE)
+    return save_outputs(data_to_save, lyrics_phrases, output_dir, output_name, lyrics_txt="\n".join(lines) + "\n")
+
+# Finished results are cached on disk by audio and configuration, so a
+# retried or re-queued song comes back without running the model again.
+# 0 disables the cache.
+CACHE_DIR = os.environ.get(
+    "TRANSCRIPTION_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared_data", "transcription_cache"),
+)
+CACHE_MAX_MB = float(os.environ.get("TRANSCRIPTION_CACHE_MAX_MB", 512))
+result_cache = TranscriptionCache(CACHE_DIR, int(CACHE_MAX_MB * 1024 * 1024))
+
+def _package_version(name):
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+def cache_config(mode, **params):
+    """Everything besides the audio that determines a result; any change is a cache miss."""
+    load_model()
+    return {
+        "mode": mode,
+        **MODEL_CONFIG,
+        # New model code (and its preprocessing) invalidates old results too
+        "qwen_asr": _package_version("qwen-asr"),
+        "transformers": _package_version("transformers"),
+        "torch": _package_version("torch"),
+        "sample_rate": SAMPLE_RATE,
+        "chunk_seconds": CHUNK_SECONDS,
+        "chunk_overlap": CHUNK_OVERLAP,
+        **params,
+    }
+
+def _to_cached(transcription):
+    time_stamps = None
+    if transcription.time_stamps is not None:
+        time_stamps = [[item.start_time, item.end_time, item.text] for item in transcription.time_stamps]
+    return {"text": transcription.text, "time_stamps": time_stamps}
+
+def _from_cached(entry):
+    time_stamps = None
+    if entry["time_stamps"] is not None:
+        time_stamps = [SimpleNamespace(start_time=start, end_time=end, text=text) for start, end, text in entry["time_stamps"]]
+    return SimpleNamespace(text=entry["text"], time_stamps=time_stamps)
+
+def build_phrases(results):
+    """Phrases of every transcription, in order (see phrases.segment)."""
+    all_phrases = []
+    for transcription in results:
+        if not transcription.text:
+            continue
+        raw_text = transcription.text.strip()
+        # If no timestamps available, just use regex to break on punctuation
+        if transcription.time_stamps is None:
+            lines = re.sub(r'([,.;?!])\s+', r'\1\n', raw_text).splitlines()
+            all_phrases.extend(Phrase(0.0, 0.0, line.strip()) for line in lines if line.strip())
+            continue
+        words = [{"start": item.start_time, "end": item.end_time, "text": item.text} for item in transcription.time_stamps]
+        all_phrases.extend(segment(words, pause=PHRASE_PAUSE, raw_text=raw_text))
+    return all_phrases
+
+def save_outputs(data_to_save, lyrics_phrases, output_dir, output_name, lyrics_txt=None):
+    """Write the phrases as TXT, LRC and WebVTT and the words as compact JSON and CSV.
+
+    Returns the JSON and CSV paths and the TXT contents.
+    """
+    if lyrics_txt is None:
+        lyrics_txt = to_txt(lyrics_phrases)
+    outputs = {
+        "txt": lyrics_txt,
+        "lrc": to_lrc(lyrics_phrases),
+        "vtt": to_vtt(lyrics_phrases),
+        "json": to_json(data_to_save),
+    }
+    for extension, contents in outputs.items():
+        with open(Path(output_dir) / f"{output_name}.{extension}", 'w', encoding='utf-8') as f:
+            f.write(contents)
+    print("writing transcription:\n" + lyrics_txt)
 
     # Save to CSV
-    csv_filename = f"{output_name}.csv"
-    csv_path = Path(output_dir) / csv_filename
+    csv_path = Path(output_dir) / f"{output_name}.csv"
     with open(csv_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=["start", "end", "text"])
         writer.writeheader()
         writer.writerows(data_to_save)
 
-    return str(json_path), str(csv_path), lyrics_txt
+    return str(Path(output_dir) / f"{output_name}.json"), str(csv_path), lyrics_txt
 
 if __name__ == "__main__":
     # Usage: python script.py my_audio.mp3 output_dir output_filename
@@ -0,0 +1,56 @@
+"""Energy-based voice activity detection for separated vocal stems.
+
+On a vocals stem the energy envelope is close to silent wherever nobody is
+singing (intros, instrumental breaks, outros), so a frame-energy threshold
+is enough to find the sung regions; no model is needed. Everything is
+vectorized with NumPy: frame energies come from one cumulative sum.
+"""
+
+import numpy as np
+
+
+def frame_energy_db(audio, sample_rate, frame_seconds=0.03, hop_seconds=0.01):
+    """RMS level in dBFS of each frame; frame i starts at i * hop_seconds."""
+    frame = max(1, int(frame_seconds * sample_rate))
+    hop = max(1, int(hop_seconds * sample_rate))
+    if len(audio) < frame:
+        audio = np.pad(audio, (0, frame - len(audio)))
+    # Sum of squares over every window via one cumulative sum: O(n), no frame copies
+    power = np.concatenate(([0.0], np.cumsum(audio.astype(np.float64) ** 2)))
+    starts = np.arange(0, len(audio) - frame + 1, hop)
+    mean_power = (power[starts + frame] - power[starts]) / frame
+    return 10 * np.log10(mean_power + 1e-12)
+
+
+def _merge(starts, ends, min_gap):
+    """Join regions separated by less than min_gap seconds."""
+    if len(starts) == 0:
+        return starts, ends
+    breaks = (starts[1:] - ends[:-1]) >= min_gap
+    return starts[np.r_[True, breaks]], ends[np.r_[breaks, True]]
+
+
+def voiced_regions(audio, sample_rate, threshold_db=35.0, floor_db=-55.0, min_silence=1.5,
+                   min_voiced=0.25, padding=0.4, frame_seconds=0.03, hop_seconds=0.01):
+    """(start, end) seconds of the regions where the stem is sung.
+
+    A frame is voiced if it is within `threshold_db` of the loud end of the
+    track (95th percentile frame) and above `floor_db`. Gaps shorter than
+    `min_silence` are bridged, blips shorter than `min_voiced` dropped, and
+    each region padded by `padding` so word onsets and tails aren't clipped.
+    """
+    duration = len(audio) / sample_rate
+    db = frame_energy_db(audio, sample_rate, frame_seconds, hop_seconds)
+    threshold = max(np.percentile(db, 95) - threshold_db, floor_db)
+    voiced = (db > threshold).astype(np.int8)
+
+    edges = np.diff(np.concatenate(([0], voiced, [0])))
+    starts = np.flatnonzero(edges == 1) * hop_seconds
+    ends = np.flatnonzero(edges == -1) * hop_seconds + (frame_seconds - hop_seconds)
+
+    starts, ends = _merge(starts, ends, min_silence)
+    keep = (ends - starts) >= min_voiced
+    starts = np.maximum(starts[keep] - padding, 0.0)
+    ends = np.minimum(ends[keep] + padding, duration)
+    starts, ends = _merge(starts, ends, 0.0)
+    return [(float(s), float(e)) for s, e in zip(starts, ends)]